@@ -1,23 +1,24 @@
-# Add this to your imports
-from src.utils import init_db, save_to_db, get_db_history
-from src.summarization import generate_summary  # Ensure this is imported
+from src.utils import init_db
 
 # Initialize the database immediately
 init_db()
 
 import streamlit as st
-import os
 import matplotlib.pyplot as plt
 from PIL import Image
 from wordcloud import WordCloud
 import pandas as pd
 
 # Import our custom modules
-from src.inference import predict_document
+from src.model_registry import get_registry_stats
+from src.cascade import get_cascade_stats
+from src.jobs import start_workers, submit_job, get_job, get_queue_stats
+from src.ocr_cache import get_cache_stats
 from src.extraction import extract_information
-from src.summarization import generate_summary
+from src.summarization import preload_summarizer, summarizer_status
 # from src.utils import save_and_log, get_history, calculate_text_metrics, delete_history_entries
-from src.utils import init_db, save_to_db, get_db_history, calculate_text_metrics, delete_db_entries
+from src.utils import calculate_text_metrics, delete_db_entries
+from src.utils import HISTORY_COUNT_CAP, get_history_page, count_history, get_category_counts, get_recent_confidence, search_documents
 
 # 1. Page Config
 st.set_page_config(page_title="DocuMind AI", page_icon="📄", layout="wide")
@@ -94,6 +95,38 @@ def load_css():
 
 load_css()
 
+# Background analysis workers (started once per server process)
+start_workers()
+
+@st.fragment(run_every=1)
+def show_job_status():
+    """Checks the submitted job every second and loads its result when it is done."""
+    job_id = st.session_state.get('job_id')
+    job = get_job(job_id) if job_id else None
+    if job is None:
+        return
+
+    if job["status"] == "queued":
+        st.info(f"⏳ Queued ({job['position']} document(s) ahead)...")
+    elif job["status"] == "running":
+        st.info("🔍 Scanning & Processing...")
+    else:
+        del st.session_state['job_id']
+        if job["status"] == "failed":
+            st.session_state['job_error'] = job["error"]
+        else:
+            # Save to Session State
+            result = job["result"]
+            st.session_state['analyzed'] = True
+            st.session_state['label'] = result["label"]
+            st.session_state['confidence'] = result["confidence"]
+            st.session_state['text'] = result["text"]
+            st.session_state['summary'] = result["summary"]  # Save summary so we don't run it again
+            st.session_state['fields'] = result.get("fields")  # Same for the extracted entities
+            st.toast("✅ Document saved to Database!", icon="🗄️")
+        # Redraw the whole page with the results
+        st.rerun(scope="app")
+
 # 3. Sidebar Navigation
 with st.sidebar:
     # You can add your Logo here if you have one
@@ -104,10 +137,22 @@ with st.sidebar:
     st.markdown("---")
     st.caption("v1.0 | Powered by LayoutLM & SpaCy")
 
+    # Summarizer loads lazily, so show where it is
+    summ_state = summarizer_status()
+    if summ_state["state"] == "ready":
+        st.caption(f"🟢 Summarizer ready ({summ_state['load_seconds']}s load)")
+    elif summ_state["state"] == "loading":
+        st.caption("🟡 Summarizer loading in background...")
+    elif summ_state["state"] == "error":
+        st.caption(f"🔴 Summarizer failed: {summ_state['error']}")
+
 # ==========================================
 # PAGE 1: ANALYSIS DASHBOARD
 # ==========================================
 if page == "Analysis Dashboard":
+    # Start loading DistilBART in the background while the user picks a file
+    preload_summarizer()
+
     # Header Section with a gradient text effect (optional HTML hack)
     st.markdown("""
     <h1 style='text-align: center; background: -webkit-linear-gradient(45deg, #60A5FA, #A78BFA); -webkit-background-clip: text; -webkit-text-fill-color: transparent;'>
@@ -135,44 +180,27 @@ if page == "Analysis Dashboard":
             st.subheader("Processing Options")
             st.info("Document detected. The system will now extract text, classify the document type, and generate a summary.")
             
+            # Long texts: classify and summarize every part instead of only the first page
+            long_document = st.checkbox("Process the full document (slower for long text)")
+
             # Primary Action Button
             analyze_btn = st.button('🚀 Analyze & Archive Document', use_container_width=True, type="primary")
 
         # Logic
         # Logic
+        # OCR -> classify -> summarize -> save runs in a background worker (src/jobs.py).
+        # We only queue it here, so the page never freezes.
         if analyze_btn:
-            with st.spinner('🔍 Scanning & Processing...'):
-                # 1. Save temp
-                if not os.path.exists("data"):
-                    os.makedirs("data")
-                temp_path = os.path.join("data", "temp_upload.jpg")
-                with open(temp_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                
-                # 2. Predict
-                label, confidence, extracted_text = predict_document(temp_path)
-                
-                # --- LABEL FIX (Optional: Keep this if you are using the generic model) ---
-                label_map = {"LABEL_0": "Resume", "LABEL_1": "Email"}
-                if label in label_map:
-                    label = label_map[label]
-                # -------------------------------------------------------------------------
-
-                # 3. Generate Summary (New Step!)
-                # We generate this NOW so we can save it to the database immediately
-                summary = generate_summary(extracted_text)
-
-                # 4. Save to Database (Replaces 'save_and_log')
-                # This saves the Image, Text, Summary, and Metadata into 'documind.db'
-                db_msg = save_to_db(uploaded_file, label, confidence, extracted_text, summary)
-                st.toast(db_msg, icon="🗄️")
-                
-                # 5. Save to Session State
-                st.session_state['analyzed'] = True
-                st.session_state['label'] = label
-                st.session_state['confidence'] = confidence
-                st.session_state['text'] = extracted_text
-                st.session_state['summary'] = summary  # Save summary so we don't run it again
+            st.session_state['job_id'] = submit_job(uploaded_file.getvalue(), uploaded_file.name,
+                                                    uploaded_file.type, {"long_document": long_document})
+            st.session_state['analyzed'] = False
+            st.session_state.pop('job_error', None)
+
+        # Poll the job (only this part of the page reruns)
+        if st.session_state.get('job_id'):
+            show_job_status()
+        if st.session_state.get('job_error'):
+            st.error(f"❌ Analysis failed: {st.session_state['job_error']}")
 
         # if analyze_btn:
         # --- RESULTS SECTION ---
@@ -209,7 +237,9 @@ if page == "Analysis Dashboard":
             # 3. Extraction (Left Column)
             with col_left:
                 st.subheader("2. Extracted Entities")
-                details = extract_information(st.session_state['text'], st.session_state['label'])
+                details = st.session_state.get('fields')
+                if details is None:
+                    details = extract_information(st.session_state['text'], st.session_state['label'])
                 if details:
                     st.table(pd.DataFrame(list(details.items()), columns=["Field", "Value"]))
                 else:
@@ -325,11 +355,60 @@ elif page == "History Log":
     st.title("📜 Database History")
     st.write("View all archived documents stored in SQLite.")
     
-    # 1. Get Data from DB
-    df_history = get_db_history()
+    # Full-text search over extracted text, summaries and file names
+    search_query = st.text_input("🔎 Search documents", placeholder="e.g. invoice total march")
+
+    # 1. Filters
+    f1, f2, f3, f4 = st.columns(4)
+    categories = ["All"] + list(get_category_counts().keys())
+    category = f1.selectbox("Category", categories)
+    date_from = f2.date_input("From", value=None)
+    date_to = f3.date_input("To", value=None)
+    min_confidence = f4.slider("Min Confidence", 0.0, 1.0, 0.0, 0.05)
+    page_size = st.select_slider("Rows per page", options=[25, 50, 100, 200], value=50)
+
+    filters = {
+        "category": None if category == "All" else category,
+        "date_from": date_from,
+        "date_to": date_to,
+        "min_confidence": min_confidence or None,
+    }
+
+    if search_query.strip():
+        # Search results: best match first, instead of the paged history
+        results = search_documents(search_query, limit=page_size, filters=filters)
+        if results.empty:
+            st.info("No documents match your search.")
+        else:
+            st.caption(f"Top {len(results)} matches")
+            st.dataframe(
+                results.drop(columns=["rank"]),
+                column_config={
+                    "upload_date": st.column_config.DatetimeColumn("Upload Date", format="D MMM YYYY, h:mm a"),
+                    "filename": st.column_config.TextColumn("File Name"),
+                    "category": st.column_config.TextColumn("Category"),
+                    "confidence": st.column_config.ProgressColumn("Confidence", min_value=0, max_value=1.0, format="%.2f"),
+                    "snippet": st.column_config.TextColumn("Match", width="large"),
+                },
+                use_container_width=True,
+                hide_index=True
+            )
+        st.stop()
+
+    # Keyset pagination: remember the cursor of every page we have visited.
+    # Changing a filter starts again from page 1.
+    filter_key = (category, date_from, date_to, min_confidence, page_size)
+    if st.session_state.get('history_filter_key') != filter_key:
+        st.session_state['history_filter_key'] = filter_key
+        st.session_state['history_cursors'] = [None]
+    cursors = st.session_state['history_cursors']
+
+    # 2. Get ONE page from DB
+    df_history, next_cursor = get_history_page(filters, limit=page_size, after=cursors[-1])
+    total = count_history(filters)  # Capped for date / confidence filters
     
     if not df_history.empty:
-        # 2. Display Data
+        # 3. Display Data
         st.dataframe(
             df_history,
             column_config={
@@ -342,6 +421,19 @@ elif page == "History Log":
             use_container_width=True,
             hide_index=True
         )
+
+        # 4. Page navigation
+        first_row = (len(cursors) - 1) * page_size + 1
+        n1, n2, n3 = st.columns([1, 2, 1])
+        if n1.button("⬅️ Previous", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+        shown = f"Showing {first_row}–{first_row + len(df_history) - 1}"
+        total_text = f"{HISTORY_COUNT_CAP:,}+" if total > HISTORY_COUNT_CAP else f"{total:,}"
+        n2.caption(f"{shown} of {total_text} documents")
+        if n3.button("Next ➡️", disabled=next_cursor is None, use_container_width=True):
+            cursors.append(next_cursor)
+            st.rerun()
     else:
         st.info("No documents found in the database yet.")
 
@@ -408,27 +500,65 @@ elif page == "History Log":
 elif page == "System Analytics":
     st.title("📊 System Analytics")
     
-    df_history = get_db_history()
+    # Aggregates come from the indexes, not from loading the whole table
+    category_counts = get_category_counts()
     
-    if not df_history.empty:
+    if category_counts:
         colA, colB = st.columns(2)
         
         with colA:
             st.subheader("Uploads by Category")
             # Database column is 'category'
-            st.bar_chart(df_history['category'].value_counts())
+            st.bar_chart(pd.Series(category_counts, name="count"))
             
         with colB:
             st.subheader("AI Confidence Trend")
             try:
                 # Database stores confidence as a float (0.95), not string ("95%")
                 # So we don't need to strip '%' anymore!
-                st.line_chart(df_history['confidence'])
+                # Last 500 documents only
+                st.line_chart(get_recent_confidence()['confidence'])
             except:
                 st.write("Insufficient data for trend analysis.")
     else:
         st.info("No data available. Process some documents first!")
 
+    # Model load & latency stats for this server process
+    with st.expander("🧠 Model Registry"):
+        registry_stats = get_registry_stats()
+        if registry_stats:
+            st.dataframe(pd.DataFrame(registry_stats), use_container_width=True, hide_index=True)
+        else:
+            st.caption("No model loaded yet. Analyze a document to warm it up.")
+
+    # Which tier answered: the cheap linear model or DistilBERT
+    with st.expander("⚡ Classification Cascade"):
+        cascade_stats = get_cascade_stats()
+        if not cascade_stats["trained"]:
+            st.caption("Cascade not trained (python src/cascade.py). Every document goes to DistilBERT.")
+        st.caption(f"Confidence threshold: {cascade_stats['threshold']:.2f}")
+        st.dataframe(pd.DataFrame(cascade_stats["tiers"]), use_container_width=True, hide_index=True)
+
+    # Background analysis queue
+    with st.expander("🧵 Job Queue"):
+        queue_stats = get_queue_stats()
+        q1, q2, q3, q4 = st.columns(4)
+        q1.metric("Queued", queue_stats["queued"])
+        q2.metric("Running", queue_stats["running"])
+        q3.metric("Done", queue_stats["done"])
+        q4.metric("Failed", queue_stats["failed"])
+
+    # Shared OCR cache (same images are never OCR'd twice)
+    with st.expander("🗂️ OCR Cache"):
+        # Running totals only; walking a large cache on every render would be slow
+        rescan = st.button("🔄 Rescan cache folder", help="Counts every file on disk (slow for a big cache)")
+        ocr_stats = get_cache_stats(rescan=rescan)
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("Cached Pages", ocr_stats["entries"] if ocr_stats["entries"] is not None else "—")
+        k2.metric("Size (MB)", f'{ocr_stats["size_mb"] if ocr_stats["size_mb"] is not None else "—"} / {ocr_stats["max_mb"]}')
+        k3.metric("Hits", ocr_stats["hits"])
+        k4.metric("Misses", ocr_stats["misses"])
+
 
 # elif page == "System Analytics":
 #     st.title("📊 System Analytics")
@@ -0,0 +1,107 @@
+import re
+import time
+import random
+import argparse
+
+try:
+    from src.extraction import _pattern_fields
+except ImportError:
+    from extraction import _pattern_fields
+
+# Words that look like OCR output: names, numbers, punctuation noise
+FILLER = ("the invoice total amount due payment terms net days customer account number "
+          "reference page of please remit to accounts payable department thank you for your "
+          "business q1 ref# no. 0042 ltd. inc. corp. dept. tel fax www.example.com").split()
+FIELD_LINES = [
+    "From: jane.doe@example.com",
+    "To: billing ©acme-corp.com",
+    "Subject: Re: Outstanding balance",
+    "Total due: $12,480.00 by 03/15/2024",
+    "Shipping $45.50 invoice date 3-1-24",
+    "Phone (555) 123-4567 / 555.987.6543",
+]
+# Lines where the fields overlap; both implementations must agree on these too
+EDGE_CASES = [
+    ("john@x.com Re: lunch", "email"), # Subject line that starts with an address
+    ("Contact: 5551234567@mail.com", "resume"), # Phone number inside an address
+]
+
+def make_ocr_text(num_lines, seed=42):
+    """Synthetic multi-page OCR output with a field line every ~20 lines."""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(num_lines):
+        if i % 20 == 0:
+            lines.append(rng.choice(FIELD_LINES))
+        else:
+            lines.append(" ".join(rng.choice(FILLER) for _ in range(rng.randint(4, 14))))
+    return "\n".join(lines)
+
+def legacy_pattern_fields(text, category):
+    """The previous implementation: one re.findall per field plus a line split."""
+    results = {}
+    text_lines = text.split('\n')
+
+    if category == "email" or category == "resume":
+        emails = re.findall(r'[a-zA-Z0-9._%+-]+[\s]?[@|©]?[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', text)
+        clean_emails = [e.replace(" ", "").replace("©", "@") for e in emails if "@" in e.replace("©", "@")]
+        if clean_emails:
+            results["Emails"] = list(set(clean_emails))
+        if category == "email":
+            for line in text_lines:
+                if "Subject:" in line or "Re:" in line:
+                    results["Subject"] = line.strip()
+                    break
+
+    if category == "invoice":
+        amounts = re.findall(r'\$\s?([0-9,]+\.[0-9]{2})', text)
+        if amounts:
+            floats = [float(a.replace(',', '')) for a in amounts]
+            results["Total Amount"] = f"${max(floats):,.2f}"
+        dates = re.findall(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', text)
+        if dates:
+            results["Dates"] = dates[:3]
+
+    if category == "resume":
+        phones = re.findall(r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', text)
+        if phones:
+            results["Phone"] = phones[0]
+
+    return results
+
+def _normalise(fields):
+    # Email order comes from a set, so compare sorted
+    return {key: sorted(value) if key == "Emails" else value for key, value in fields.items()}
+
+def best_of(fn, text, category, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(text, category)
+        timings.append(time.perf_counter() - start)
+    return 1000 * min(timings)
+
+def main(num_lines=50000, repeats=5):
+    text = make_ocr_text(num_lines)
+    print(f"📄 Synthetic OCR text: {len(text) / 1024:.0f} KB, {num_lines} lines (best of {repeats})")
+    print("-" * 60)
+
+    for edge_text, category in EDGE_CASES:
+        same = _normalise(legacy_pattern_fields(edge_text, category)) == _normalise(_pattern_fields(edge_text, category))
+        print(f"{category:<8} edge case {edge_text!r}: same fields: {'✅' if same else '❌'}")
+    print("-" * 60)
+
+    for category in ["email", "resume", "invoice"]:
+        same = _normalise(legacy_pattern_fields(text, category)) == _normalise(_pattern_fields(text, category))
+        old_ms = best_of(legacy_pattern_fields, text, category, repeats)
+        new_ms = best_of(_pattern_fields, text, category, repeats)
+        print(f"{category:<8} legacy {old_ms:8.1f} ms | single-pass {new_ms:8.1f} ms | "
+              f"{old_ms / new_ms:4.1f}x | same fields: {'✅' if same else '❌'}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark: legacy regex extraction vs the single-pass scanner.")
+    parser.add_argument("--lines", type=int, default=50000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    main(args.lines, args.repeats)
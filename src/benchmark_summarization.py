@@ -0,0 +1,71 @@
+import time
+import argparse
+import numpy as np
+
+try:
+    from src.summarization import generate_summary, get_summarizer
+    from src.dataset_store import load_frame
+except ImportError:
+    from summarization import generate_summary, get_summarizer
+    from dataset_store import load_frame
+
+# Used when no dataset has been built yet
+SAMPLE_TEXT = (
+    "The quarterly report covers revenue, operating costs and the outlook for the next period. "
+    "Revenue grew by twelve percent compared to the same quarter last year. "
+    "Most of the growth came from the invoicing product, which added three large customers. "
+    "Operating costs rose more slowly than revenue because hiring was paused in the spring. "
+    "The board approved a new budget for document processing infrastructure. "
+    "Customer support response times improved after the new ticketing system went live. "
+    "Management expects growth to continue, although currency movements remain a risk. "
+    "The company will publish its annual report together with audited figures in March. "
+)
+
+def load_texts(limit):
+    """Real OCR texts from the dataset (longest first), or a synthetic document."""
+    try:
+        df = load_frame(columns=['text']).dropna()
+        texts = sorted(df['text'].tolist(), key=len, reverse=True)
+        texts = [t for t in texts if len(t.split()) >= 50][:limit]
+        if texts:
+            return texts
+    except (OSError, KeyError):
+        pass
+    return [SAMPLE_TEXT * 3] * limit
+
+def time_mode(texts, mode):
+    """Per-document latencies in ms for one summarization mode (cache disabled)."""
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        generate_summary(text, mode=mode, use_cache=False)
+        latencies.append(1000 * (time.perf_counter() - start))
+    return np.array(latencies)
+
+def report(name, latencies):
+    print(f"{name:<12} n={len(latencies):<4} mean {latencies.mean():9.1f} ms | "
+          f"p50 {np.percentile(latencies, 50):9.1f} ms | p95 {np.percentile(latencies, 95):9.1f} ms")
+
+def main(num_docs=50, num_abstractive=5):
+    texts = load_texts(num_docs)
+    print(f"📄 Benchmarking on {len(texts)} documents (avg {np.mean([len(t.split()) for t in texts]):.0f} words)")
+
+    extractive = time_mode(texts, "extractive")
+
+    # Load DistilBART up front so its load time is not counted as latency
+    get_summarizer()
+    abstractive = time_mode(texts[:num_abstractive], "abstractive")
+
+    print("-" * 75)
+    report("extractive", extractive)
+    report("abstractive", abstractive)
+    print("-" * 75)
+    print(f"⚡ Extractive is {abstractive.mean() / extractive.mean():.0f}x faster per document")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare extractive vs DistilBART summarization latency.")
+    parser.add_argument("--docs", type=int, default=50, help="Documents for the extractive run")
+    parser.add_argument("--abstractive-docs", type=int, default=5, help="Documents for the (slow) abstractive run")
+    args = parser.parse_args()
+
+    main(args.docs, args.abstractive_docs)
@@ -0,0 +1,171 @@
+import os
+import time
+import argparse
+import threading
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import make_pipeline
+
+try:
+    from src.dataset_store import load_frame
+except ImportError:
+    from dataset_store import load_frame
+
+# CONFIG
+# Tier 1 of the classification cascade: a hashed bag-of-words linear model.
+# It answers the obvious documents (email headers, dollar totals) in well under
+# a millisecond; everything it is unsure about goes to DistilBERT (tier 2).
+CASCADE_PATH = os.path.join("models", "cascade_v1.joblib")
+CONFIDENCE_THRESHOLD = float(os.environ.get("DOCUMIND_CASCADE_THRESHOLD", "0.90"))
+USE_CASCADE = os.environ.get("DOCUMIND_CASCADE", "1") == "1"
+NUM_FEATURES = 2 ** 18 # Hashed vocabulary size (no vocabulary to store)
+TIERS = ("fast", "transformer")
+
+# ==========================================
+# MODEL (loaded once per process)
+# ==========================================
+_model = None
+_loaded_mtime = None
+_lock = threading.Lock()
+
+# How many documents each tier answered in this process
+_traffic = {tier: 0 for tier in TIERS}
+
+
+def build_pipeline():
+    """Word unigrams + bigrams hashed into NUM_FEATURES columns, then a logistic-loss linear model."""
+    return make_pipeline(
+        HashingVectorizer(n_features=NUM_FEATURES, ngram_range=(1, 2), alternate_sign=False, norm="l2"),
+        SGDClassifier(loss="log_loss", alpha=1e-5, max_iter=20, tol=None, random_state=42),
+    )
+
+
+def get_fast_classifier(path=CASCADE_PATH):
+    """
+    Returns the trained tier-1 pipeline, or None if it has not been trained yet.
+    Reloads automatically when the file on disk changes (after retraining).
+    """
+    global _model, _loaded_mtime
+    if not os.path.exists(path):
+        return None
+
+    mtime = os.path.getmtime(path)
+    if _model is not None and _loaded_mtime == mtime:
+        return _model
+
+    with _lock:
+        if _model is None or _loaded_mtime != mtime:
+            _model = joblib.load(path)
+            _loaded_mtime = mtime
+    return _model
+
+
+def fast_predict(texts, path=CASCADE_PATH):
+    """
+    Tier-1 predictions for a list of texts.
+    Returns [(label, confidence), ...], or None if the cascade is not trained.
+    """
+    model = get_fast_classifier(path)
+    if model is None:
+        return None
+
+    probs = model.predict_proba(list(texts))
+    best = probs.argmax(axis=1)
+    return [(model.classes_[j], float(probs[i, j])) for i, j in enumerate(best)]
+
+
+def split_by_confidence(texts, threshold=CONFIDENCE_THRESHOLD, path=CASCADE_PATH):
+    """
+    Runs tier 1 over every text.
+    Returns (answered, remaining):
+      answered:  {index: (label, confidence)} for texts at or above the threshold
+      remaining: indexes that need the transformer
+    If the cascade is not trained, everything is remaining.
+    """
+    predictions = fast_predict(texts, path)
+    if predictions is None:
+        return {}, list(range(len(texts)))
+
+    answered, remaining = {}, []
+    for i, (label, confidence) in enumerate(predictions):
+        if confidence >= threshold:
+            answered[i] = (label, confidence)
+        else:
+            remaining.append(i)
+    return answered, remaining
+
+
+def record_traffic(tier, num_documents=1):
+    with _lock:
+        _traffic[tier] += num_documents
+
+
+def get_cascade_stats():
+    """Documents and traffic fraction per tier for this process."""
+    with _lock:
+        total = sum(_traffic.values())
+        return {
+            "trained": os.path.exists(CASCADE_PATH),
+            "threshold": CONFIDENCE_THRESHOLD,
+            "tiers": [
+                {"tier": tier, "documents": count, "fraction": round(count / total, 4) if total else 0.0}
+                for tier, count in _traffic.items()
+            ],
+        }
+
+
+# ==========================================
+# TRAINING
+# ==========================================
+def coverage_report(model, texts, labels, thresholds=(0.5, 0.7, 0.8, 0.9, 0.95, 0.99)):
+    """For each threshold: fraction of documents tier 1 would answer, and its accuracy on them."""
+    probs = model.predict_proba(texts)
+    confidences = probs.max(axis=1)
+    predicted = model.classes_[probs.argmax(axis=1)]
+    labels = np.asarray(labels)
+
+    rows = []
+    for threshold in thresholds:
+        mask = confidences >= threshold
+        rows.append({
+            "threshold": threshold,
+            "coverage": float(mask.mean()),
+            "accuracy": float((predicted[mask] == labels[mask]).mean()) if mask.any() else 0.0,
+        })
+    return rows
+
+
+def train_cascade(save_path=CASCADE_PATH):
+    """
+    1. Trains the hashed linear model on the TRAIN split.
+    2. Prints coverage/accuracy per threshold on the VAL split (to pick the threshold).
+    3. Saves the pipeline with joblib.
+    """
+    train_df = load_frame("train", columns=["text", "category"]).dropna(subset=["text"])
+    print(f"🏋️ Training tier-1 classifier on {len(train_df)} documents...")
+
+    start = time.perf_counter()
+    model = build_pipeline()
+    model.fit(train_df["text"].tolist(), train_df["category"].tolist())
+    print(f"✅ Trained in {time.perf_counter() - start:.1f}s")
+
+    val_df = load_frame("val", columns=["text", "category"]).dropna(subset=["text"])
+    if len(val_df):
+        print("\nthreshold | coverage | accuracy (val split)")
+        for row in coverage_report(model, val_df["text"].tolist(), val_df["category"].tolist()):
+            print(f"{row['threshold']:9.2f} | {row['coverage']:8.1%} | {row['accuracy']:8.2%}")
+
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    joblib.dump(model, save_path)
+    print(f"\n💾 Cascade model saved to: {save_path}")
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the cheap first tier of the classification cascade.")
+    parser.add_argument("--output", default=CASCADE_PATH)
+    args = parser.parse_args()
+
+    train_cascade(args.output)
@@ -1,79 +1,257 @@
 import os
+import json
+import argparse
 import pandas as pd
-from ocr_engine import extract_text
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from ocr_engine import ocr_image
+from dataset_store import save_dataset
+from utils import file_sha256
 
 # Define where our data lives
 DATA_DIR = os.path.join("data", "raw")
 OUTPUT_FILE = os.path.join("data", "processed", "documind_dataset.csv")
 
-def create_dataset():
+# OCR results are appended here as they finish, so an interrupted run can resume
+CHECKPOINT_FILE = os.path.join("data", "processed", "ocr_checkpoint.jsonl")
+
+# What each raw file looked like when it was last OCR'd (for incremental rebuilds)
+MANIFEST_FILE = os.path.join("data", "processed", "manifest.json")
+
+def list_images(limit=None):
     """
-    Loops through train/val/test folders, reads images, 
-    extracts text, and saves to a CSV.
+    Walks data/raw/{train,val,test}/<category> and returns one job per image.
+    limit: optional max images per category (handy for quick tests).
     """
-    data = []
-    
+    jobs = []
+
     # We will loop through 'train', 'val', and 'test'
     splits = ['train', 'val', 'test']
-    
-    print("🚀 Starting Dataset Creation... this might take a while!")
-    
+
     for split in splits:
         split_path = os.path.join(DATA_DIR, split)
-        
+
         # Check if the split folder exists (e.g. data/raw/train)
         if not os.path.exists(split_path):
             print(f"⚠️ Warning: {split_path} not found. Skipping.")
             continue
-            
+
         # Loop through categories (invoice, email, etc.)
-        categories = os.listdir(split_path)
-        
-        for category in categories:
+        for category in sorted(os.listdir(split_path)):
             category_path = os.path.join(split_path, category)
-            
+
             # Skip if it's a file, we only want folders
             if not os.path.isdir(category_path):
                 continue
-                
-            print(f"📂 Processing {split} / {category} ...")
-            
-            # Get all images in this category
-            images = os.listdir(category_path)
-            
-            # --- LIMIT FOR TESTING ---
-            # processing 1000s of images takes hours. 
-            # Let's process only 5 per category to test the code first.
-            # Change this to 'images' (remove [:5]) later to run on ALL files.
-            images_to_process = images[:100]
-            
-            for img_name in images_to_process:
-                img_path = os.path.join(category_path, img_name)
-                
-                # 1. Run OCR
-                extracted_text = extract_text(img_path)
-                
-                # 2. Add to list if text was found
-                if extracted_text:
-                    data.append({
-                        "filename": img_name,
-                        "category": category,
-                        "split": split,
-                        "text": extracted_text.strip() # Remove extra spaces
-                    })
-    
-    # 3. Save to CSV
+
+            images = sorted(os.listdir(category_path))
+            if limit:
+                images = images[:limit]
+
+            for img_name in images:
+                jobs.append({
+                    "path": os.path.join(category_path, img_name),
+                    "filename": img_name,
+                    "category": category,
+                    "split": split,
+                })
+
+    return jobs
+
+def _job_key(job):
+    return (job["split"], job["category"], job["filename"])
+
+def load_checkpoint():
+    """Returns {(split, category, filename): row} for every image already OCR'd."""
+    done = {}
+    if not os.path.exists(CHECKPOINT_FILE):
+        return done
+
+    with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line may be half-written if the run was killed
+                continue
+            done[_job_key(row)] = row
+    return done
+
+def _ocr_job(job):
+    """
+    Runs in a worker process. Returns the job row with its OCR text.
+    If OCR fails, the row has "error" set (and no text), so the file is retried next run.
+    """
+    row = {
+        "filename": job["filename"],
+        "category": job["category"],
+        "split": job["split"],
+        "sha256": job["sha256"],
+    }
+    try:
+        # ocr_image checks the shared OCR cache first
+        text = ocr_image(job["path"])
+    except Exception as e:
+        print(f"Error processing {job['path']}: {e}")
+        return dict(row, text="", error=f"{type(e).__name__}: {e}")
+    return dict(row, text=text.strip() if text else "") # Remove extra spaces
+
+def run_ocr(jobs, workers=1):
+    """
+    OCRs every job, in parallel when workers > 1.
+    Each result is appended to the checkpoint file as soon as it is ready
+    (failed ones are not, so a resumed run tries them again).
+    Yields result rows in completion order.
+    """
+    if not jobs:
+        return
+
+    os.makedirs(os.path.dirname(CHECKPOINT_FILE), exist_ok=True)
+    checkpoint = open(CHECKPOINT_FILE, "a", encoding="utf-8")
+
+    try:
+        if workers <= 1:
+            results = (_ocr_job(job) for job in jobs)
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            futures = [pool.submit(_ocr_job, job) for job in jobs]
+            results = (future.result() for future in as_completed(futures))
+
+        for count, row in enumerate(results, start=1):
+            if "error" not in row:
+                checkpoint.write(json.dumps(row, ensure_ascii=False) + "\n")
+                checkpoint.flush()
+            if count % 50 == 0 or count == len(jobs):
+                print(f"   🔎 OCR {count}/{len(jobs)}")
+            yield row
+    finally:
+        checkpoint.close()
+        if workers > 1:
+            pool.shutdown(cancel_futures=True)
+
+def load_manifest():
+    """Returns {"split/category/filename": {"size", "mtime", "sha256"}} from the last build."""
+    if not os.path.exists(MANIFEST_FILE):
+        return {}
+    with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest):
+    # Write to a temp file first so a crash never leaves a broken manifest
+    tmp_path = MANIFEST_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+def diff_against_manifest(jobs, manifest):
+    """
+    Splits jobs into (changed, new_manifest).
+    Size + mtime unchanged -> trusted without reading the file.
+    Otherwise the content hash decides (a touched but identical file is not re-OCR'd).
+    Every job gets its "sha256" filled in.
+    """
+    changed = []
+    new_manifest = {}
+
+    for job in jobs:
+        key = "/".join(_job_key(job))
+        info = os.stat(job["path"])
+        old = manifest.get(key)
+
+        if old and old["size"] == info.st_size and old["mtime"] == info.st_mtime:
+            job["sha256"] = old["sha256"]
+        else:
+            job["sha256"] = file_sha256(job["path"])
+            if not old or old["sha256"] != job["sha256"]:
+                changed.append(job)
+
+        new_manifest[key] = {"size": info.st_size, "mtime": info.st_mtime, "sha256": job["sha256"]}
+
+    return changed, new_manifest
+
+def load_existing_rows():
+    """Returns {(split, category, filename): row} from the current dataset CSV."""
+    if not os.path.exists(OUTPUT_FILE):
+        return {}
+    df = pd.read_csv(OUTPUT_FILE, keep_default_na=False)
+    return {_job_key(row): row for row in df.to_dict("records")}
+
+def create_dataset(workers=1, limit=None, fresh=False, tokenizer_name=None):
+    """
+    Loops through train/val/test folders, reads images,
+    extracts text, and saves to a CSV.
+    Only new or changed files are OCR'd; rows of deleted files are dropped.
+    workers: number of OCR processes (1 = serial).
+    limit: optional max images per category.
+    fresh: ignore the manifest and checkpoint and OCR everything again.
+    tokenizer_name: also store input_ids/attention_mask in the Parquet copy.
+    """
+    print("🚀 Starting Dataset Creation... this might take a while!")
+
+    if fresh:
+        for path in (CHECKPOINT_FILE, MANIFEST_FILE):
+            if os.path.exists(path):
+                os.remove(path)
+
+    jobs = list_images(limit)
+    manifest = load_manifest()
+    existing = load_existing_rows() if manifest else {}
+
+    # 1. Find what changed since the last build
+    changed, new_manifest = diff_against_manifest(jobs, manifest)
+    deleted = set(manifest) - set(new_manifest)
+    if manifest:
+        print(f"🧾 Manifest: {len(changed)} new/changed, {len(deleted)} deleted, {len(jobs) - len(changed)} unchanged.")
+
+    # 2. Skip files OCR'd by an interrupted earlier run (same content only)
+    done = load_checkpoint()
+    todo = [job for job in changed
+            if done.get(_job_key(job), {}).get("sha256") != job["sha256"]]
+
+    if len(todo) < len(changed):
+        print(f"♻️ Resuming: {len(changed) - len(todo)} of {len(changed)} images already in checkpoint.")
+    print(f"📂 {len(todo)} images to OCR with {workers} worker(s)...")
+
+    # 3. Run OCR (results land in the checkpoint as they finish)
+    failed = 0
+    for row in run_ocr(todo, workers=workers):
+        done[_job_key(row)] = row
+        if "error" in row:
+            # Not in the manifest = "new" next time, so a one-off OCR failure gets retried
+            new_manifest.pop("/".join(_job_key(row)), None)
+            failed += 1
+    if failed:
+        print(f"⚠️ {failed} image(s) failed OCR; they are left out and retried on the next run.")
+
+    # 4. Merge: fresh OCR for changed files, old rows for the rest.
+    # Files that no longer exist are simply not in 'jobs', so their rows are dropped.
+    changed_keys = {_job_key(job) for job in changed}
+    data = []
+    for job in jobs:
+        key = _job_key(job)
+        row = done[key] if key in changed_keys else existing.get(key)
+        if row and row["text"]:
+            data.append({column: row[column] for column in ["filename", "category", "split", "text"]})
+
+    # 5. Save to CSV
     print(f"✅ Processing complete! Found {len(data)} documents.")
-    
+
     if len(data) > 0:
-        df = pd.DataFrame(data)
-        
+        df = pd.DataFrame(data, columns=["filename", "category", "split", "text"])
+
         # Ensure the output directory exists
         os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-        
+
         df.to_csv(OUTPUT_FILE, index=False)
+        save_manifest(new_manifest)
         print(f"💾 Dataset saved to: {OUTPUT_FILE}")
-        
+
+        # Columnar copy for training/evaluation (memory-mapped on load)
+        save_dataset(df, tokenizer_name=tokenizer_name)
+
+        # The dataset is complete, so the checkpoint is no longer needed
+        if os.path.exists(CHECKPOINT_FILE):
+            os.remove(CHECKPOINT_FILE)
+
         # Show a sneak peek
         print("\n--- First 5 Rows ---")
         print(df.head())
@@ -81,4 +259,11 @@ def create_dataset():
         print("❌ No data extracted. Check your paths.")
 
 if __name__ == "__main__":
-    create_dataset()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the DocuMind dataset from data/raw.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of OCR processes (1 = serial)")
+    parser.add_argument("--limit", type=int, default=None, help="Max images per category (default: all)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore the manifest and checkpoint and start over")
+    parser.add_argument("--tokenizer", default=None, help="Pre-tokenize the Parquet copy with this tokenizer (e.g. distilbert-base-uncased)")
+    args = parser.parse_args()
+
+    create_dataset(workers=args.workers, limit=args.limit, fresh=args.fresh, tokenizer_name=args.tokenizer)
@@ -0,0 +1,106 @@
+import os
+import json
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# CONFIG
+# One Parquet file per split: data/processed/documind_dataset/{train,val,test}.parquet
+PARQUET_DIR = os.path.join("data", "processed", "documind_dataset")
+META_FILE = os.path.join(PARQUET_DIR, "_meta.json")
+CSV_FILE = os.path.join("data", "processed", "documind_dataset.csv")
+
+
+def has_parquet():
+    return os.path.exists(META_FILE)
+
+
+def load_meta():
+    """Returns the dataset metadata (splits, row counts, tokenizer used for input_ids)."""
+    if not has_parquet():
+        return {}
+    with open(META_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_tokenized_for(tokenizer_name, max_length=512):
+    """True if the stored input_ids/attention_mask were made by this tokenizer."""
+    meta = load_meta()
+    return meta.get("tokenizer") == tokenizer_name and meta.get("max_length") == max_length
+
+
+def save_dataset(df, tokenizer_name=None, max_length=512):
+    """
+    Writes the dataset as one Parquet file per split.
+    If tokenizer_name is given, input_ids and attention_mask (unpadded) are stored too,
+    so training and evaluation can skip tokenization.
+    """
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_name) if tokenizer_name else None
+
+    # Write into a temp folder and swap it in, so readers never see half a dataset
+    tmp_dir = PARQUET_DIR + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    rows = {}
+    for split, split_df in df.groupby("split", sort=True):
+        table = pa.Table.from_pandas(split_df.reset_index(drop=True), preserve_index=False)
+
+        if tokenizer is not None:
+            # One split at a time keeps peak memory bounded
+            encodings = tokenizer(split_df["text"].tolist(), truncation=True, max_length=max_length)
+            table = table.append_column("input_ids", pa.array(encodings["input_ids"], type=pa.list_(pa.int32())))
+            table = table.append_column("attention_mask", pa.array(encodings["attention_mask"], type=pa.list_(pa.int8())))
+
+        pq.write_table(table, os.path.join(tmp_dir, f"{split}.parquet"))
+        rows[split] = len(split_df)
+
+    meta = {
+        "splits": sorted(rows),
+        "rows": rows,
+        "tokenizer": tokenizer_name,
+        "max_length": max_length if tokenizer_name else None,
+    }
+    with open(os.path.join(tmp_dir, "_meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+
+    shutil.rmtree(PARQUET_DIR, ignore_errors=True)
+    os.replace(tmp_dir, PARQUET_DIR)
+    print(f"💾 Parquet dataset saved to: {PARQUET_DIR} ({sum(rows.values())} rows)")
+
+
+def dataset_files(split=None):
+    """Paths of the Parquet files for one split (or all splits)."""
+    splits = [split] if split else load_meta().get("splits", [])
+    return [os.path.join(PARQUET_DIR, f"{name}.parquet") for name in splits]
+
+
+def load_hf_dataset(split=None):
+    """
+    Returns a Hugging Face Dataset backed by memory-mapped Arrow files.
+    Rows are read from disk on demand, so the corpus can be larger than RAM.
+    """
+    from datasets import Dataset
+
+    return Dataset.from_parquet(dataset_files(split))
+
+
+def load_frame(split=None, columns=None):
+    """
+    Returns a pandas DataFrame, reading only the requested split and columns.
+    Falls back to the CSV when no Parquet dataset has been built yet.
+    """
+    if not has_parquet():
+        usecols = columns
+        if columns and split and "split" not in columns:
+            usecols = columns + ["split"]
+        df = pd.read_csv(CSV_FILE, usecols=usecols)
+        if split:
+            df = df[df["split"] == split]
+        return df[columns] if columns else df
+
+    tables = [pq.read_table(path, columns=columns, memory_map=True) for path in dataset_files(split)]
+    return pa.concat_tables(tables).to_pandas()
@@ -1,71 +1,154 @@
 import os
+import io
+import json
+import time
+import hashlib
+import argparse
+import psutil
 import torch
+import numpy as np
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from datasets import Dataset
+
+try:
+    from src.model_registry import get_classifier, model_fingerprint
+    from src.dataset_store import load_frame
+    from src.inference import classify_texts
+    from src.cascade import CASCADE_PATH, CONFIDENCE_THRESHOLD, TIERS
+except ImportError:
+    from model_registry import get_classifier, model_fingerprint
+    from dataset_store import load_frame
+    from inference import classify_texts
+    from cascade import CASCADE_PATH, CONFIDENCE_THRESHOLD, TIERS
 
 # CONFIG
 MODEL_PATH = os.path.join("models", "documind_v1")
 DATA_PATH = os.path.join("data", "processed", "documind_dataset.csv")
 
-def evaluate():
-    print("⏳ Loading Model & Test Data...")
-    
-    # 1. Load Model
-    try:
-        tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH)
-        model = AutoModelForSequenceClassification.from_pretrained(MODEL_PATH)
-    except:
-        print("❌ Model not found! Train it first.")
-        return
+# Predictions are saved here, keyed by model checkpoint + test set
+PREDICTIONS_CACHE_DIR = os.path.join("data", "cache", "predictions")
+LATENCY_SAMPLE = 100 # Documents classified one at a time for the p50/p95 latency
 
-    # 2. Load Data
-    df = pd.read_csv(DATA_PATH)
-    df = df.dropna(subset=['text'])
-    
+def _predictions_cache_path(texts, batch_size, backend, cascade):
+    # "v2": latencies_ms holds single-document latency (older files hold batch time / batch size)
+    key = f"v2|{model_fingerprint(MODEL_PATH)}|{batch_size}|{backend}"
+    if cascade:
+        # Tier-1 model and threshold change the answers too
+        mtime = os.path.getmtime(CASCADE_PATH) if os.path.exists(CASCADE_PATH) else 0
+        key += f"|cascade|{mtime}|{CONFIDENCE_THRESHOLD}"
+    digest = hashlib.sha256(key.encode("utf-8"))
+    for text in texts:
+        digest.update(text.encode("utf-8") + b"\0")
+    return os.path.join(PREDICTIONS_CACHE_DIR, f"{digest.hexdigest()[:16]}.json")
+
+def run_predictions(texts, batch_size=32, use_cache=True, backend="torch", cascade=False):
+    """
+    Batched inference over every text with dynamic padding, then single-document
+    latency on the first LATENCY_SAMPLE texts (see measure_latency).
+    Returns {"labels", "tiers", "latencies_ms", "total_seconds", "cached"}.
+    Results are cached per checkpoint, so re-plotting never re-runs the model.
+    cascade=False measures the transformer alone.
+    """
+    cache_path = _predictions_cache_path(texts, batch_size, backend, cascade)
+    if use_cache and os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        result["cached"] = True
+        return result
+
+    tiers = []
+    start = time.perf_counter()
+    predictions = classify_texts(texts, batch_size=batch_size, model_dir=MODEL_PATH,
+                                 backend=backend, cascade=cascade, tiers=tiers)
+    total_seconds = time.perf_counter() - start
+
+    result = {
+        "labels": [label for label, _ in predictions],
+        "tiers": tiers,
+        "latencies_ms": measure_latency(texts, backend=backend, cascade=cascade),
+        "total_seconds": total_seconds,
+    }
+    os.makedirs(PREDICTIONS_CACHE_DIR, exist_ok=True)
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+    result["cached"] = False
+    return result
+
+def measure_latency(texts, backend="torch", cascade=False, sample_size=LATENCY_SAMPLE):
+    """
+    Per-document latency: one classify_texts call per text (batch size 1), the way the app
+    classifies a single upload. Batch time / batch size would only be amortized throughput.
+    Returns milliseconds for each of the first sample_size texts.
+    """
+    texts = texts[:sample_size]
+    latencies = []
+    for text in texts[:1] + texts:
+        start = time.perf_counter()
+        classify_texts([text], batch_size=1, model_dir=MODEL_PATH, backend=backend, cascade=cascade)
+        latencies.append(1000 * (time.perf_counter() - start))
+    # The first call is a warm-up (lazy model load, allocator)
+    return latencies[1:]
+
+def load_test_data():
+    """Returns (label_list, label2id, test_df) for the TEST split."""
+    # Columnar: only the columns and split we need
     # Create Labels
-    label_list = df['category'].unique().tolist()
+    label_list = load_frame(columns=['category'])['category'].unique().tolist()
     label_list.sort()
     label2id = {label: i for i, label in enumerate(label_list)}
-    
+
     # Filter for TEST split only (Data the model hasn't seen)
-    test_df = df[df['split'] == 'test']
-    
-    # Optimization: Use a smaller sample for speed if dataset is huge
-    if len(test_df) > 500:
-        test_df = test_df.sample(500, random_state=42)
-        
-    print(f"✅ Evaluating on {len(test_df)} test documents...")
-
-    # 3. Run Predictions
-    predictions = []
-    true_labels = []
-
-    model.eval() # Set to evaluation mode
-    
+    test_df = load_frame('test', columns=['text', 'category'])
+    test_df = test_df.dropna(subset=['text'])
+    return label_list, label2id, test_df
+
+def score(result, label_list, label2id, test_df):
+    """Accuracy, macro F1, throughput and latency percentiles for one prediction run."""
+    true_labels = [label2id[category] for category in test_df['category']]
+    # Labels the dataset doesn't know (e.g. a placeholder model) count as wrong
+    predictions = [label2id.get(label, -1) for label in result["labels"]]
+
+    report = classification_report(true_labels, predictions, labels=list(range(len(label_list))),
+                                   target_names=label_list, output_dict=True, zero_division=0)
+    latencies = np.array(result["latencies_ms"]) if result["latencies_ms"] else np.zeros(1)
+
+    return {
+        "true_labels": true_labels,
+        "predictions": predictions,
+        "accuracy": accuracy_score(true_labels, predictions),
+        "macro_f1": report['macro avg']['f1-score'],
+        "docs_per_sec": len(test_df) / result["total_seconds"] if result["total_seconds"] else 0.0,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+def evaluate(batch_size=32, use_cache=True, backend="torch"):
+    print(f"⏳ Loading Model ({backend}) & Test Data...")
+
+    # 1. Load Model (shared, already in eval mode)
+    try:
+        get_classifier(MODEL_PATH, backend)
+    except OSError:
+        print("❌ Model not found! Train it first.")
+        return
+
+    # 2. Load Data
+    label_list, label2id, test_df = load_test_data()
+    print(f"✅ Evaluating on all {len(test_df)} test documents...")
+
+    # 3. Run Predictions (batched, whole test split)
     print("🚀 Running Inference...")
-    for index, row in test_df.iterrows():
-        text = row['text']
-        true_label_id = label2id[row['category']]
-        
-        # Tokenize
-        inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
-        
-        # Predict
-        with torch.no_grad():
-            outputs = model(**inputs)
-            pred_id = torch.argmax(outputs.logits, dim=1).item()
-            
-        predictions.append(pred_id)
-        true_labels.append(true_label_id)
+    result = run_predictions(test_df['text'].tolist(), batch_size=batch_size, use_cache=use_cache, backend=backend)
+    if result["cached"]:
+        print("⚡ Loaded predictions from cache (same checkpoint & test set)")
 
     # 4. Calculate Metrics
-    acc = accuracy_score(true_labels, predictions)
-    report = classification_report(true_labels, predictions, target_names=label_list, output_dict=True)
-    macro_f1 = report['macro avg']['f1-score']
+    metrics = score(result, label_list, label2id, test_df)
+    true_labels, predictions = metrics["true_labels"], metrics["predictions"]
+    acc, macro_f1 = metrics["accuracy"], metrics["macro_f1"]
 
     print("\n" + "="*30)
     print("📊 FINAL EVALUATION REPORT")
@@ -73,22 +156,137 @@ def evaluate():
     print(f"✅ Accuracy:  {acc:.2%}")
     print(f"✅ Macro F1:  {macro_f1:.2f}")
     print("-" * 30)
+    print(f"⚡ Throughput: {metrics['docs_per_sec']:.1f} docs/sec (batch size {batch_size}, {backend})")
+    print(f"⏱️ Latency:    p50 {metrics['p50_ms']:.1f} ms | p95 {metrics['p95_ms']:.1f} ms per document "
+          f"(one at a time, {len(result['latencies_ms'])} documents)")
+    print("-" * 30)
 
     # 5. Generate Confusion Matrix
-    cm = confusion_matrix(true_labels, predictions)
-    
+    cm = confusion_matrix(true_labels, predictions, labels=list(range(len(label_list))))
+
     # Plot it
     plt.figure(figsize=(10, 8))
     sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=label_list, yticklabels=label_list)
     plt.xlabel('Predicted')
     plt.ylabel('Actual')
     plt.title('Confusion Matrix')
-    
+
     # Save the plot
     save_path = os.path.join("data", "confusion_matrix.png")
     plt.savefig(save_path)
     print(f"📉 Confusion Matrix saved to: {save_path}")
     plt.show()
 
+def _weights_mb(model):
+    """Serialized size of the model weights (what would ship to production)."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes / (1024 * 1024)
+
+def compare_backends(backends=("torch", "int8"), batch_size=32):
+    """
+    Side-by-side report for several backends on the same test split:
+    accuracy, macro F1, docs/sec, p50/p95 latency and memory.
+    The first backend is the baseline for the accuracy delta.
+    """
+    label_list, label2id, test_df = load_test_data()
+    texts = test_df['text'].tolist()
+    process = psutil.Process()
+    rows = []
+
+    print(f"⚖️ Comparing {', '.join(backends)} on {len(test_df)} test documents...")
+    for backend in backends:
+        # Resident memory added by loading this backend
+        rss_before = process.memory_info().rss
+        try:
+            _, model = get_classifier(MODEL_PATH, backend)
+        except OSError as e:
+            print(f"❌ Skipping {backend}: {e}")
+            continue
+        rss_mb = (process.memory_info().rss - rss_before) / (1024 * 1024)
+
+        # Always re-run: we are measuring speed, not re-reading a cache
+        result = run_predictions(texts, batch_size=batch_size, use_cache=False, backend=backend)
+        metrics = score(result, label_list, label2id, test_df)
+
+        rows.append({
+            "backend": backend,
+            "accuracy": metrics["accuracy"],
+            "macro_f1": metrics["macro_f1"],
+            "docs_per_sec": metrics["docs_per_sec"],
+            "p50_ms": metrics["p50_ms"],
+            "p95_ms": metrics["p95_ms"],
+            "rss_load_mb": rss_mb,
+            "weights_mb": _weights_mb(model) if hasattr(model, "state_dict") else None,
+        })
+
+    if not rows:
+        print("❌ Model not found! Train it first.")
+        return None
+
+    report = pd.DataFrame(rows).set_index("backend")
+    report["accuracy_delta"] = report["accuracy"] - report["accuracy"].iloc[0]
+
+    print("\n" + "="*30)
+    print("📊 BACKEND COMPARISON")
+    print("="*30)
+    print(report.round(4).to_string())
+    return report
+
+def evaluate_cascade(batch_size=32, backend="torch"):
+    """
+    Cascade vs transformer-only on the test split.
+    Reports the share of documents each tier answered, the accuracy of each tier
+    on its own share, and overall accuracy / throughput of both setups.
+    """
+    if not os.path.exists(CASCADE_PATH):
+        print("❌ Cascade not trained! Run: python src/cascade.py")
+        return None
+
+    label_list, label2id, test_df = load_test_data()
+    texts = test_df['text'].tolist()
+    true_labels = np.array(test_df['category'].tolist())
+
+    print(f"⚖️ Cascade (threshold {CONFIDENCE_THRESHOLD:.2f}) vs transformer on {len(test_df)} test documents...")
+    baseline = run_predictions(texts, batch_size=batch_size, use_cache=False, backend=backend, cascade=False)
+    cascaded = run_predictions(texts, batch_size=batch_size, use_cache=False, backend=backend, cascade=True)
+
+    labels = np.array(cascaded["labels"])
+    tiers = np.array(cascaded["tiers"])
+    rows = []
+    for tier in TIERS:
+        mask = tiers == tier
+        rows.append({
+            "tier": tier,
+            "documents": int(mask.sum()),
+            "traffic_fraction": float(mask.mean()),
+            "accuracy": float((labels[mask] == true_labels[mask]).mean()) if mask.any() else float("nan"),
+        })
+    report = pd.DataFrame(rows).set_index("tier")
+
+    print("\n" + "="*30)
+    print("📊 CASCADE REPORT")
+    print("="*30)
+    print(report.round(4).to_string())
+    print("-" * 30)
+    for name, result in [("transformer only", baseline), ("cascade", cascaded)]:
+        accuracy = (np.array(result["labels"]) == true_labels).mean()
+        docs_per_sec = len(texts) / result["total_seconds"] if result["total_seconds"] else 0.0
+        print(f"{name:<17} accuracy {accuracy:.2%} | {docs_per_sec:.1f} docs/sec")
+    return report
+
 if __name__ == "__main__":
-    evaluate()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Evaluate the DocuMind classifier on the test split.")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--no-cache", action="store_true", help="Re-run inference even if cached predictions exist")
+    parser.add_argument("--backend", choices=["torch", "int8", "onnx"], default="torch", help="onnx needs: python src/onnx_backend.py")
+    parser.add_argument("--compare-quantized", action="store_true", help="Compare full-precision vs int8 (accuracy, latency, memory)")
+    parser.add_argument("--cascade", action="store_true", help="Per-tier traffic and accuracy of the cascade (needs: python src/cascade.py)")
+    args = parser.parse_args()
+
+    if args.compare_quantized:
+        compare_backends(("torch", "int8"), batch_size=args.batch_size)
+    elif args.cascade:
+        evaluate_cascade(batch_size=args.batch_size, backend=args.backend)
+    else:
+        evaluate(batch_size=args.batch_size, use_cache=not args.no_cache, backend=args.backend)
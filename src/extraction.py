@@ -1,15 +1,30 @@
 import re
 import spacy
 
+SPACY_MODEL = "en_core_web_sm"
+
 # Load the NLP model once (Global variable)
 # "en_core_web_sm" is a small English model trained on web text
 try:
-    nlp = spacy.load("en_core_web_sm")
+    nlp = spacy.load(SPACY_MODEL)
 except OSError:
     print("⚠️ SpaCy model not found. Downloading it now...")
     from spacy.cli import download
-    download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
+    download(SPACY_MODEL)
+    nlp = spacy.load(SPACY_MODEL)
+
+# NER-only copy for batch extraction (loaded on first use)
+_ner_nlp = None
+
+def get_ner_pipeline():
+    """
+    Returns en_core_web_sm with every component except NER excluded.
+    We only read doc.ents, so tagger, parser and lemmatizer are wasted work.
+    """
+    global _ner_nlp
+    if _ner_nlp is None:
+        _ner_nlp = spacy.load(SPACY_MODEL, exclude=[name for name in nlp.pipe_names if name != "ner"])
+    return _ner_nlp
 
 def extract_information(text, category):
     """
@@ -17,10 +32,37 @@ def extract_information(text, category):
     1. SpaCy NER (Named Entity Recognition) -> For People & Companies.
     2. Regex (Pattern Matching) -> For Dates, Emails, Money.
     """
-    results = {}
-    
     # --- 1. SPACY (AI NER) ---
-    doc = nlp(text)
+    results = _entity_fields(nlp(text))
+
+    # --- 2. REGEX (PATTERNS) ---
+    results.update(_pattern_fields(text, category))
+    return results
+
+def extract_information_batch(texts, categories, batch_size=64, n_process=1):
+    """
+    Same fields as extract_information, for many documents at once.
+    Texts are streamed through the NER-only pipeline with nlp.pipe.
+    categories: one category per text (or a single category for all).
+    n_process > 1 uses multiprocessing (call it under if __name__ == "__main__").
+    Returns a list of result dicts in input order.
+    """
+    if isinstance(categories, str):
+        categories = [categories] * len(texts)
+
+    ner = get_ner_pipeline()
+    docs = ner.pipe((text or "" for text in texts), batch_size=batch_size, n_process=n_process)
+
+    results = []
+    for text, category, doc in zip(texts, categories, docs):
+        fields = _entity_fields(doc)
+        fields.update(_pattern_fields(text or "", category))
+        results.append(fields)
+    return results
+
+def _entity_fields(doc):
+    """People and organisations found by spaCy NER."""
+    results = {}
     
     # Extract distinct entities to avoid duplicates
     people = list(set([ent.text for ent in doc.ents if ent.label_ == "PERSON"]))
@@ -36,43 +78,75 @@ def extract_information(text, category):
     if orgs:
         results["Organizations"] = orgs[:5]
 
-    # --- 2. REGEX (PATTERNS) ---
-    text_lines = text.split('\n')
-    
-    # EMAIL Category Specifics
-    if category == "email" or category == "resume":
-        emails = re.findall(r'[a-zA-Z0-9._%+-]+[\s]?[@|©]?[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', text)
-        clean_emails = [e.replace(" ", "").replace("©", "@") for e in emails if "@" in e.replace("©", "@")]
-        if clean_emails:
-            results["Emails"] = list(set(clean_emails))
-
-        # Find "Subject" line (Only for emails)
-        if category == "email":
-            for line in text_lines:
-                if "Subject:" in line or "Re:" in line:
-                    results["Subject"] = line.strip()
-                    break
-
-    # INVOICE Category Specifics
-    if category == "invoice":
-        # Find Money ($500.00)
-        amounts = re.findall(r'\$\s?([0-9,]+\.[0-9]{2})', text)
-        if amounts:
-            try:
-                floats = [float(a.replace(',', '')) for a in amounts]
-                results["Total Amount"] = f"${max(floats):,.2f}"
-            except:
-                pass
-        
-        # Find Dates (mm/dd/yyyy)
-        dates = re.findall(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', text)
-        if dates:
-            results["Dates"] = dates[:3]
-
-    # RESUME Category Specifics
-    if category == "resume":
-        phones = re.findall(r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', text)
-        if phones:
-            results["Phone"] = phones[0]
-
-    return results
\ No newline at end of file
+    return results
+
+# ==========================================
+# SINGLE-PASS FIELD SCANNER
+# ==========================================
+# One named group per field. Each category gets a few combined, precompiled
+# patterns (usually one), so the text is scanned once per pattern and every
+# match is dispatched by name. Fields whose matches can overlap (a phone number
+# inside an email address) need separate patterns: one alternation consumes
+# the text and the other field would never see it.
+
+# Lookbehind: only try at the start of a token, not at every character inside it
+EMAIL = r'(?<![a-zA-Z0-9._%+-])(?P<email>[a-zA-Z0-9._%+-]+\s?[@©][a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'
+# Zero-width lookahead: records the line without consuming it (emails on it still match)
+SUBJECT_LINE = r'^(?=(?P<subject>[^\n]*(?:Subject:|Re:)[^\n]*))'
+PHONE = r'(?P<phone>\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4})'
+# Both invoice fields start with "$" or a digit. Starting the pattern with that
+# character class lets the regex engine jump straight to candidate positions;
+# the lookbehinds then decide which field it is.
+MONEY_OR_DATE = r'[$0-9](?:(?<=\$)\s?(?P<money>[0-9,]+\.[0-9]{2})|(?<=[0-9])(?P<date>[0-9]?[/-]\d{1,2}[/-]\d{2,4}))'
+
+SCANNERS = {
+    # Subject first: the zero-width match lets an email at the start of the same line still match
+    "email": [re.compile(SUBJECT_LINE + "|" + EMAIL, re.MULTILINE)],
+    "resume": [re.compile(EMAIL), re.compile(PHONE)],
+    "invoice": [re.compile(MONEY_OR_DATE)],
+}
+
+def scan_fields(text, category):
+    """Scans text once per pattern and returns {field: [matches in order]} for the category."""
+    found = {}
+    for scanner in SCANNERS.get(category, []):
+        for field in scanner.groupindex:
+            found[field] = []
+        for match in scanner.finditer(text):
+            field = match.lastgroup
+            # Whole match, except zero-width (lookahead) fields which live in their group
+            found[field].append(match.group(0) or match.group(field))
+    return found
+
+def _pattern_fields(text, category):
+    """Emails, subject, money, dates and phones found by the single-pass scanner."""
+    results = {}
+    found = scan_fields(text, category)
+
+    # EMAIL / RESUME
+    emails = [e.replace(" ", "").replace("©", "@") for e in found.get("email", [])]
+    if emails:
+        results["Emails"] = list(set(emails))
+
+    # Find "Subject" line (Only for emails)
+    if found.get("subject"):
+        results["Subject"] = found["subject"][0].strip()
+
+    # INVOICE: Find Money ($500.00)
+    amounts = found.get("money", [])
+    if amounts:
+        try:
+            floats = [float(a.lstrip('$').strip().replace(',', '')) for a in amounts]
+            results["Total Amount"] = f"${max(floats):,.2f}"
+        except ValueError:
+            pass
+
+    # INVOICE: Find Dates (mm/dd/yyyy)
+    if found.get("date"):
+        results["Dates"] = found["date"][:3]
+
+    # RESUME: Phone
+    if found.get("phone"):
+        results["Phone"] = found["phone"][0]
+
+    return results
@@ -1,69 +1,282 @@
 # gemini version
 import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import pytesseract
-from PIL import Image
 import os
+import time
+
+try:
+    from src.model_registry import get_classifier, get_model_lock, record_inference
+    from src.ocr_engine import ocr_image
+    from src.cascade import USE_CASCADE, split_by_confidence, record_traffic
+except ImportError:
+    from model_registry import get_classifier, get_model_lock, record_inference
+    from ocr_engine import ocr_image
+    from cascade import USE_CASCADE, split_by_confidence, record_traffic
 
 # CONFIG
 # We load the model from the folder where training will save it
 MODEL_DIR = os.path.join("models", "documind_v1") 
 
+# Tesseract Path is configured in ocr_engine.py
+
+# Sliding-window mode (long documents)
+WINDOW_STRIDE = 128 # Tokens shared by two consecutive windows
+MAX_WINDOWS = 8 # Worst case: one batch of 8 x 512 tokens
+AGGREGATIONS = ("mean", "max")
 
-# Tesseract Path (Keep your existing path)
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+# Generic model label names -> readable names (for the untrained fallback model).
+# Applied by everything that archives documents, so all routes store the same categories.
+LABEL_MAP = {"LABEL_0": "Resume", "LABEL_1": "Email"}
 
 
-def predict_document(image_path):
+def predict_document(image_path, backend=None, sliding_window=False, aggregate="mean", cascade=None, text=None):
     """
     1. Reads the image.
     2. Extracts text using OCR.
-    3. Feeds text to DistilBERT.
+    3. Feeds text to DistilBERT (unless the cheap cascade tier is already confident).
     4. Returns the category.
+    backend: "torch", "int8" or "onnx" (default: DOCUMIND_BACKEND env var, else torch).
+    sliding_window: classify the whole text (see classify_text_windows) instead of the first 512 tokens.
+    cascade: try the linear tier first (default: DOCUMIND_CASCADE env var, on).
+    text: already-extracted text (skips the OCR step; image_path may then be None).
     """
     
-    # 1. OCR: Get text from image
-    try:
-        image = Image.open(image_path)
-        text = pytesseract.image_to_string(image)
-    except Exception as e:
-        return f"Error reading image: {e}", 0.0
+    # 1. OCR: Get text from image (cached by image content)
+    if text is None:
+        try:
+            text = ocr_image(image_path)
+        except Exception as e:
+            return f"Error reading image: {e}", 0.0
 
     # If OCR failed to find text
     if not text.strip():
         return "No text found in document", 0.0
 
+    # Cascade: obvious documents never reach DistilBERT
+    if (USE_CASCADE if cascade is None else cascade):
+        answered, _ = split_by_confidence([text])
+        if answered:
+            record_traffic("fast")
+            label, confidence = answered[0]
+            return label, confidence, text
+
     # 2. Load Model (Only if not already loaded)
-    # We do this inside the function or globally
+    # The registry keeps one warm copy per process
     try:
-        tokenizer = AutoTokenizer.from_pretrained(MODEL_DIR)
-        model = AutoModelForSequenceClassification.from_pretrained(MODEL_DIR)
+        tokenizer, model = get_classifier(MODEL_DIR, backend)
     except OSError:
         return "Model not found. Wait for training to finish!", 0.0
 
-    # 3. Prepare Text for AI
-    inputs = tokenizer(
-        text, 
-        return_tensors="pt", 
-        truncation=True, 
-        padding="max_length", 
-        max_length=512
-    )
-
-    # 4. Predict
-    with torch.no_grad():
-        outputs = model(**inputs)
-        logits = outputs.logits
-        probs = torch.nn.functional.softmax(logits, dim=-1)
-        
-        # Get the highest probability
-        confidence, predicted_class_idx = torch.max(probs, dim=-1)
-        
-        # Get the label name (e.g., "invoice")
-        label = model.config.id2label[predicted_class_idx.item()]
+    # Long documents: every page gets a vote
+    if sliding_window:
+        label, confidence, _ = classify_text_windows(text, aggregate=aggregate, backend=backend)
+        record_traffic("transformer")
+        return label, confidence, text
+
+    # Background workers share this model: one document at a time
+    with get_model_lock(MODEL_DIR, backend):
+        # 3. Prepare Text for AI
+        # A single document needs no padding at all
+        inputs = tokenizer(
+            text, 
+            return_tensors="pt", 
+            truncation=True, 
+            max_length=512
+        )
+
+        # 4. Predict
+        start = time.perf_counter()
+        with torch.no_grad():
+            outputs = model(**inputs)
+            logits = outputs.logits
+            probs = torch.nn.functional.softmax(logits, dim=-1)
+            
+            # Get the highest probability
+            confidence, predicted_class_idx = torch.max(probs, dim=-1)
+            
+            # Get the label name (e.g., "invoice")
+            label = model.config.id2label[predicted_class_idx.item()]
+    record_inference(MODEL_DIR, time.perf_counter() - start, backend=backend)
+    record_traffic("transformer")
     
     return label, confidence.item(), text
 
+
+# ==========================================
+# SLIDING-WINDOW API (long documents)
+# ==========================================
+def classify_text_windows(text, max_length=512, stride=WINDOW_STRIDE, max_windows=MAX_WINDOWS,
+                          aggregate="mean", model_dir=MODEL_DIR, backend=None):
+    """
+    Classifies the WHOLE text instead of only its first max_length tokens.
+    1. Tokenizes once, splitting into overlapping windows (overflowing tokens + stride).
+    2. Keeps at most max_windows windows, picked evenly across the document.
+    3. Runs all windows as ONE padded batch.
+    4. Aggregates the window probabilities: "mean" (average) or "max" (best window per class).
+    Returns (label, confidence, window_scores), where window_scores is one {label: probability} dict per window.
+    Raises OSError if the model is not trained yet.
+    """
+    if aggregate not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregate '{aggregate}'. Choose one of {AGGREGATIONS}.")
+
+    tokenizer, model = get_classifier(model_dir, backend)
+    with get_model_lock(model_dir, backend):
+        encodings = tokenizer(
+            text,
+            truncation=True,
+            max_length=max_length,
+            stride=stride,
+            return_overflowing_tokens=True,
+        )
+
+        # Bound the latency: evenly spaced windows, so the end of the document still counts
+        num_windows = len(encodings["input_ids"])
+        if num_windows > max_windows:
+            if max_windows > 1:
+                picked = [round(i * (num_windows - 1) / (max_windows - 1)) for i in range(max_windows)]
+            else:
+                picked = [0]
+        else:
+            picked = list(range(num_windows))
+
+        # Only real model inputs (drops overflow_to_sample_mapping)
+        keys = [key for key in tokenizer.model_input_names if key in encodings]
+        features = [{key: encodings[key][i] for key in keys} for i in picked]
+        inputs = tokenizer.pad(features, padding=True, return_tensors="pt")
+
+        start = time.perf_counter()
+        with torch.no_grad():
+            probs = torch.nn.functional.softmax(model(**inputs).logits, dim=-1)
+    record_inference(model_dir, time.perf_counter() - start, backend=backend)
+
+    if aggregate == "mean":
+        scores = probs.mean(dim=0)
+    else:
+        scores = probs.max(dim=0).values
+    confidence, class_id = torch.max(scores, dim=-1)
+
+    id2label = model.config.id2label
+    window_scores = [
+        {id2label[j]: round(p, 4) for j, p in enumerate(row)}
+        for row in probs.tolist()
+    ]
+    return id2label[class_id.item()], confidence.item(), window_scores
+
+
+# ==========================================
+# BATCH API (bulk archive runs)
+# ==========================================
+def classify_texts(texts, batch_size=16, max_length=512, model_dir=MODEL_DIR, backend=None,
+                   cascade=None, tiers=None):
+    """
+    Classifies a list of already-extracted texts.
+    1. Cascade (if enabled and trained): the linear tier answers every text it is confident about.
+    2. Everything else goes to the transformer in length-sorted, dynamically padded batches.
+    Returns [(label, confidence), ...] in the original order.
+    If a tiers list is given, the tier that answered ("fast" or "transformer") is appended per document, in order.
+    Raises OSError if the transformer is needed but not trained yet.
+    """
+    if not texts:
+        return []
+
+    results = [None] * len(texts)
+    answered, remaining = {}, list(range(len(texts)))
+
+    # 1. Cheap tier first
+    if (USE_CASCADE if cascade is None else cascade):
+        answered, remaining = split_by_confidence(texts)
+        for i, prediction in answered.items():
+            results[i] = prediction
+        record_traffic("fast", len(answered))
+
+    # 2. Transformer for the rest
+    if remaining:
+        predictions = _transformer_classify([texts[i] for i in remaining], batch_size, max_length, model_dir, backend)
+        for i, prediction in zip(remaining, predictions):
+            results[i] = prediction
+        record_traffic("transformer", len(remaining))
+
+    if tiers is not None:
+        tiers.extend("fast" if i in answered else "transformer" for i in range(len(texts)))
+    return results
+
+
+def _transformer_classify(texts, batch_size, max_length, model_dir, backend):
+    """
+    DistilBERT over a list of texts.
+    1. Tokenizes everything once (no padding) to learn each length.
+    2. Sorts by length so each batch holds similar-sized documents.
+    3. Pads each batch only to its longest member and runs one forward pass.
+    """
+    tokenizer, model = get_classifier(model_dir, backend)
+    lock = get_model_lock(model_dir, backend)
+    with lock:
+        encodings = tokenizer(list(texts), truncation=True, max_length=max_length)
+
+    # Length bucketing: shortest documents first
+    order = sorted(range(len(texts)), key=lambda i: len(encodings["input_ids"][i]))
+    results = [None] * len(texts)
+
+    for start in range(0, len(order), batch_size):
+        batch_ids = order[start:start + batch_size]
+        features = [{key: encodings[key][i] for key in encodings.keys()} for i in batch_ids]
+
+        # Held per batch, so a single upload can slip in between the batches of a bulk run
+        with lock:
+            # Dynamic padding: only up to the longest document in this batch
+            inputs = tokenizer.pad(features, padding=True, return_tensors="pt")
+
+            batch_start = time.perf_counter()
+            with torch.no_grad():
+                logits = model(**inputs).logits
+                probs = torch.nn.functional.softmax(logits, dim=-1)
+                confidences, class_ids = torch.max(probs, dim=-1)
+        batch_seconds = time.perf_counter() - batch_start
+        record_inference(model_dir, batch_seconds, len(batch_ids), backend=backend)
+
+        for row, i in enumerate(batch_ids):
+            label = model.config.id2label[class_ids[row].item()]
+            results[i] = (label, confidences[row].item())
+
+    return results
+
+
+def predict_documents(paths_or_texts, batch_size=16, backend=None):
+    """
+    Batched version of predict_document.
+    Each item can be an image path (it gets OCR'd) or raw text.
+    Returns [(label, confidence, text), ...] in the original order.
+    """
+    texts = []
+    results = [None] * len(paths_or_texts)
+
+    # 1. OCR: image paths become text, everything else is used as-is
+    for i, item in enumerate(paths_or_texts):
+        if isinstance(item, str) and os.path.isfile(item):
+            try:
+                text = ocr_image(item)
+            except Exception as e:
+                results[i] = (f"Error reading image: {e}", 0.0, "")
+                continue
+        else:
+            text = item or ""
+
+        if not text.strip():
+            results[i] = ("No text found in document", 0.0, text)
+            continue
+        texts.append((i, text))
+
+    # 2. Classify all documents that have text
+    try:
+        predictions = classify_texts([text for _, text in texts], batch_size=batch_size, backend=backend)
+    except OSError:
+        predictions = [("Model not found. Wait for training to finish!", 0.0)] * len(texts)
+
+    for (i, text), (label, confidence) in zip(texts, predictions):
+        results[i] = (label, confidence, text)
+
+    return results
+
+
 if __name__ == "__main__":
     # Test with a dummy path
     print("Inference script ready. Run via App.")
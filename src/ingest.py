@@ -0,0 +1,191 @@
+import os
+import time
+import argparse
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from src.ocr_engine import ocr_bytes
+    from src.inference import classify_texts, LABEL_MAP
+    from src.extraction import extract_information_batch
+    from src.summarization import generate_summary
+    from src.utils import init_db, save_many_to_db, get_archived_hashes, file_sha256, close_connection
+except ImportError:
+    from ocr_engine import ocr_bytes
+    from inference import classify_texts, LABEL_MAP
+    from extraction import extract_information_batch
+    from summarization import generate_summary
+    from utils import init_db, save_many_to_db, get_archived_hashes, file_sha256, close_connection
+
+# CONFIG
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+STAGES = ("ocr_wait", "classify", "extract", "summarize", "write")
+
+# ==========================================
+# 1. PLAN: which files are new?
+# ==========================================
+def scan_directory(directory):
+    """Every image under directory (recursive), in a stable order."""
+    paths = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+def plan_jobs(paths):
+    """
+    Hashes every file and keeps only content that is not archived yet
+    (same hash as the blob store, so renamed copies are skipped too).
+    Returns (jobs, skipped).
+    """
+    hashes = [file_sha256(path) for path in paths]
+    archived = get_archived_hashes(set(hashes))
+
+    jobs, seen = [], set()
+    for path, sha in zip(paths, hashes):
+        if sha in archived or sha in seen:
+            continue
+        seen.add(sha)
+        jobs.append({"path": path, "sha256": sha})
+    return jobs, len(paths) - len(jobs)
+
+# ==========================================
+# 2. PIPELINE
+# ==========================================
+def _read_and_ocr(job):
+    """Runs in the OCR thread pool (Tesseract is an external process, so threads run in parallel)."""
+    with open(job["path"], "rb") as f:
+        file_bytes = f.read()
+    try:
+        text = ocr_bytes(file_bytes).strip()
+    except Exception as e:
+        print(f"⚠️ OCR failed for {job['path']}: {e}")
+        text = ""
+    return dict(job, file_bytes=file_bytes, text=text)
+
+def process_chunk(rows, stats, batch_size, summary_mode, summary_pool):
+    """Classify -> extract -> summarize -> write for one chunk of OCR'd files."""
+    empty = [row for row in rows if not row["text"]]
+    rows = [row for row in rows if row["text"]]
+    stats["no_text"] += len(empty)
+    if not rows:
+        return
+
+    texts = [row["text"] for row in rows]
+
+    start = time.perf_counter()
+    # Same category names as uploads through the app
+    predictions = [(LABEL_MAP.get(label, label), confidence)
+                   for label, confidence in classify_texts(texts, batch_size=batch_size)]
+    stats["seconds"]["classify"] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    fields = extract_information_batch(texts, [label for label, _ in predictions])
+    stats["seconds"]["extract"] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    summaries = list(summary_pool.map(lambda text: generate_summary(text, mode=summary_mode), texts))
+    stats["seconds"]["summarize"] += time.perf_counter() - start
+
+    records = []
+    for row, (label, confidence), doc_fields, summary in zip(rows, predictions, fields, summaries):
+        records.append({
+            "filename": os.path.basename(row["path"]),
+            "file_bytes": row["file_bytes"],
+            "file_type": mimetypes.guess_type(row["path"])[0],
+            "category": label,
+            "confidence": confidence,
+            "text": row["text"],
+            "summary": summary,
+            "fields": doc_fields,
+        })
+
+    # One executemany + commit for the whole chunk
+    start = time.perf_counter()
+    stats["archived"] += save_many_to_db(records, batch_size=len(records))
+    stats["seconds"]["write"] += time.perf_counter() - start
+
+def ingest_directory(directory, chunk_size=64, ocr_workers=4, batch_size=16, summary_mode="extractive", summary_workers=1):
+    """
+    Archives every new image in directory.
+    Files are processed in chunks of chunk_size; while one chunk goes through the
+    model stages, the OCR pool is already working on the next one.
+    Concurrency is bounded per stage: ocr_workers OCR threads, one classifier
+    batch of batch_size at a time, summary_workers summary threads.
+    Returns the stats dict.
+    """
+    init_db()
+    paths = scan_directory(directory)
+    print(f"📂 Found {len(paths)} images in {directory}")
+
+    jobs, skipped = plan_jobs(paths)
+    print(f"⏭️ {skipped} already archived (or duplicates), {len(jobs)} to ingest")
+
+    stats = {"found": len(paths), "skipped": skipped, "archived": 0, "no_text": 0,
+             "seconds": {stage: 0.0 for stage in STAGES}}
+    if not jobs:
+        stats["total_seconds"] = 0.0
+        return stats
+
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    run_start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=ocr_workers) as ocr_pool, \
+         ThreadPoolExecutor(max_workers=summary_workers) as summary_pool:
+        pending = [ocr_pool.submit(_read_and_ocr, job) for job in chunks[0]]
+
+        for index in range(len(chunks)):
+            start = time.perf_counter()
+            rows = [future.result() for future in pending]
+            stats["seconds"]["ocr_wait"] += time.perf_counter() - start
+
+            # Start OCR of the next chunk before the model stages of this one
+            if index + 1 < len(chunks):
+                pending = [ocr_pool.submit(_read_and_ocr, job) for job in chunks[index + 1]]
+
+            process_chunk(rows, stats, batch_size, summary_mode, summary_pool)
+
+            done = min((index + 1) * chunk_size, len(jobs))
+            elapsed = time.perf_counter() - run_start
+            print(f"   📦 {done}/{len(jobs)} files | {done / elapsed:.1f} files/sec")
+
+    stats["total_seconds"] = time.perf_counter() - run_start
+    return stats
+
+def print_report(stats):
+    seconds = stats["seconds"]
+    total = stats["total_seconds"]
+    print("\n" + "="*30)
+    print("📊 INGEST REPORT")
+    print("="*30)
+    print(f"✅ Archived:   {stats['archived']}")
+    print(f"⏭️ Skipped:    {stats['skipped']} (already archived or duplicate)")
+    print(f"⚠️ No text:    {stats['no_text']}")
+    print("-" * 30)
+    print(f"⚡ Throughput: {stats['archived'] / total if total else 0.0:.1f} docs/sec ({total:.1f}s total)")
+    print("⏱️ Stage time: " + " | ".join(f"{stage} {seconds[stage]:.1f}s" for stage in STAGES))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive every image in a folder: OCR -> classify -> extract -> summarize -> documind.db")
+    parser.add_argument("directory")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Files per pipeline chunk (and per DB transaction)")
+    parser.add_argument("--ocr-workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--batch-size", type=int, default=16, help="Classifier batch size")
+    parser.add_argument("--summary-mode", choices=["extractive", "abstractive"], default="extractive")
+    parser.add_argument("--summary-workers", type=int, default=1,
+                        help="Summary threads (abstractive summaries share one model and run one at a time)")
+    args = parser.parse_args()
+
+    try:
+        result = ingest_directory(args.directory, chunk_size=args.chunk_size, ocr_workers=args.ocr_workers,
+                                  batch_size=args.batch_size, summary_mode=args.summary_mode,
+                                  summary_workers=args.summary_workers)
+    except OSError as e:
+        # Usually: the classifier has not been trained yet
+        print(f"❌ Ingest stopped: {e}")
+        raise SystemExit(1)
+    finally:
+        close_connection()
+
+    print_report(result)
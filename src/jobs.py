@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import datetime
+import threading
+
+try:
+    from src.ocr_engine import ocr_bytes
+    from src.inference import predict_document, LABEL_MAP
+    from src.extraction import extract_information
+    from src.summarization import generate_summary
+    from src.utils import (transaction, get_connection, save_many_to_db,
+                           store_blob, get_blob, release_blob)
+except ImportError:
+    from ocr_engine import ocr_bytes
+    from inference import predict_document, LABEL_MAP
+    from extraction import extract_information
+    from summarization import generate_summary
+    from utils import (transaction, get_connection, save_many_to_db,
+                       store_blob, get_blob, release_blob)
+
+# CONFIG
+# Background analysis: the app only submits a job and polls it, so a long OCR +
+# summary run never freezes the Streamlit script. Jobs live in documind.db and
+# survive restarts.
+# Workers overlap OCR and extraction; the classifier and the summarizer are shared
+# per process and run one document at a time (see get_model_lock / _generate_lock).
+NUM_WORKERS = int(os.environ.get("DOCUMIND_JOB_WORKERS", "2"))
+POLL_SECONDS = 0.5 # How often an idle worker checks for new jobs
+KEEP_FINISHED_DAYS = 7 # Finished jobs (and their results) are purged after this
+MAX_ATTEMPTS = 3 # A job that was interrupted this often is failed instead of requeued
+
+STATUSES = ("queued", "running", "done", "failed")
+
+# ==========================================
+# QUEUE (SQLite)
+# ==========================================
+def init_jobs():
+    with transaction() as c:
+        c.execute('''CREATE TABLE IF NOT EXISTS jobs
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      status TEXT NOT NULL,
+                      filename TEXT,
+                      file_type TEXT,
+                      blob_hash TEXT,
+                      params TEXT,
+                      result TEXT,
+                      error TEXT,
+                      attempts INTEGER NOT NULL DEFAULT 0,
+                      document_id INTEGER,
+                      created_at TIMESTAMP,
+                      started_at TIMESTAMP,
+                      finished_at TIMESTAMP)''')
+        # Queues created before document_id existed
+        columns = {row[1] for row in c.execute("PRAGMA table_info(jobs)")}
+        if "document_id" not in columns:
+            c.execute("ALTER TABLE jobs ADD COLUMN document_id INTEGER")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id)")
+
+def submit_job(file_bytes, filename, file_type=None, params=None):
+    """Queues one document for analysis. Returns the job id (returns at once)."""
+    blob_hash = store_blob(file_bytes)
+    with transaction() as c:
+        c.execute('''INSERT INTO jobs (status, filename, file_type, blob_hash, params, created_at)
+                     VALUES ('queued', ?, ?, ?, ?, ?)''',
+                  (filename, file_type, blob_hash, json.dumps(params or {}), datetime.datetime.now()))
+        job_id = c.lastrowid
+    _wake_up.set()
+    return job_id
+
+def get_job(job_id):
+    """Returns the job as a dict (result decoded), or None. Cheap enough to poll every second."""
+    conn = get_connection()
+    row = conn.execute('''SELECT id, status, filename, result, error, created_at, started_at, finished_at
+                          FROM jobs WHERE id = ?''', (job_id,)).fetchone()
+    if row is None:
+        return None
+
+    job = dict(zip(["id", "status", "filename", "result", "error", "created_at", "started_at", "finished_at"], row))
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    if job["status"] == "queued":
+        # How many jobs will run before this one
+        job["position"] = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id < ?",
+                                       (job_id,)).fetchone()[0]
+    return job
+
+def get_queue_stats():
+    """{status: count} for every status."""
+    rows = get_connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+    stats = {status: 0 for status in STATUSES}
+    stats.update(dict(rows))
+    return stats
+
+def _claim_next_job():
+    """
+    Marks the oldest queued job as running.
+    Returns (id, blob_hash, filename, file_type, params, document_id), or None.
+    """
+    with transaction() as c:
+        row = c.execute('''SELECT id, blob_hash, filename, file_type, params, document_id FROM jobs
+                           WHERE status = 'queued' ORDER BY id LIMIT 1''').fetchone()
+        if row is None:
+            return None
+        # Only one worker wins: the status check makes the update a no-op for the others
+        c.execute('''UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1
+                     WHERE id = ? AND status = 'queued' ''', (datetime.datetime.now(), row[0]))
+        if c.rowcount != 1:
+            return None
+    return row
+
+def _finish_job(job_id, blob_hash, result=None, error=None):
+    with transaction() as c:
+        c.execute('''UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, blob_hash = NULL
+                     WHERE id = ?''',
+                  ("failed" if error else "done", json.dumps(result) if result else None, error,
+                   datetime.datetime.now(), job_id))
+        # The archived document (if any) holds its own reference to the upload
+        release_blob(blob_hash)
+
+def requeue_interrupted_jobs():
+    """Jobs left 'running' by a stopped server go back to the queue. Returns how many."""
+    with transaction() as c:
+        # A document that keeps crashing the server is not retried forever (and its upload is released)
+        given_up = c.execute('''SELECT blob_hash FROM jobs
+                                WHERE status = 'running' AND attempts >= ? AND blob_hash IS NOT NULL''',
+                             (MAX_ATTEMPTS,)).fetchall()
+        c.execute('''UPDATE jobs SET status = 'failed', error = 'Interrupted too many times', finished_at = ?,
+                     blob_hash = NULL
+                     WHERE status = 'running' AND attempts >= ?''', (datetime.datetime.now(), MAX_ATTEMPTS))
+        for (blob_hash,) in given_up:
+            release_blob(blob_hash)
+        c.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+        return c.rowcount
+
+def purge_finished_jobs(days=KEEP_FINISHED_DAYS):
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=days)
+    with transaction() as c:
+        c.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (cutoff,))
+
+# ==========================================
+# PIPELINE (what "Analyze & Archive" does)
+# ==========================================
+def run_analysis(file_bytes, filename, file_type=None, long_document=False, job_id=None):
+    """
+    1. OCR
+    2. Classification
+    3. Extraction + Summary
+    4. Save to Database (and, for a job, record the new document id in the same transaction)
+    Returns {"label", "confidence", "text", "summary", "fields"}. Raises if the document cannot be analyzed.
+    """
+    text = ocr_bytes(file_bytes)
+
+    prediction = predict_document(None, sliding_window=long_document, text=text)
+    if len(prediction) == 2:
+        # (message, 0.0): no text found or model missing
+        raise RuntimeError(prediction[0])
+    label, confidence, text = prediction
+    label = LABEL_MAP.get(label, label)
+
+    fields = extract_information(text, label)
+    summary = generate_summary(text, long_document=long_document)
+
+    with transaction() as c:
+        save_many_to_db([{
+            "filename": filename,
+            "file_bytes": file_bytes,
+            "file_type": file_type,
+            "category": label,
+            "confidence": confidence,
+            "text": text,
+            "summary": summary,
+            "fields": fields,
+        }])
+        if job_id is not None:
+            # A job requeued after a crash sees this id and does not archive the document twice
+            c.execute("UPDATE jobs SET document_id = last_insert_rowid() WHERE id = ?", (job_id,))
+    return {"label": label, "confidence": confidence, "text": text, "summary": summary, "fields": fields}
+
+def _archived_result(document_id):
+    """The result of a job whose document was archived before the server stopped (None if it was deleted since)."""
+    row = get_connection().execute('''SELECT category, confidence, extracted_text, summary, fields
+                                      FROM documents WHERE id = ?''', (document_id,)).fetchone()
+    if row is None:
+        return None
+    label, confidence, text, summary, fields = row
+    return {"label": label, "confidence": confidence, "text": text, "summary": summary,
+            "fields": json.loads(fields) if fields else {}}
+
+# ==========================================
+# WORKER POOL
+# ==========================================
+_workers = []
+_wake_up = threading.Event()
+_start_lock = threading.Lock()
+
+def _worker_loop():
+    while True:
+        try:
+            job = _claim_next_job()
+        except Exception as e:
+            # e.g. database locked for longer than busy_timeout: try again later
+            print(f"⚠️ Worker could not read the queue: {e}")
+            time.sleep(POLL_SECONDS)
+            continue
+        if job is None:
+            # Idle: sleep until a submit wakes us (or the next poll)
+            _wake_up.wait(POLL_SECONDS)
+            _wake_up.clear()
+            continue
+
+        job_id, blob_hash, filename, file_type, params, document_id = job
+        params = json.loads(params or "{}")
+        result, error = None, None
+        try:
+            result = _archived_result(document_id) if document_id is not None else None
+            if result is None:
+                result = run_analysis(get_blob(blob_hash), filename, file_type,
+                                      params.get("long_document", False), job_id=job_id)
+            print(f"✅ Job {job_id} done: {filename} -> {result['label']}")
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            print(f"❌ Job {job_id} failed: {error}")
+
+        try:
+            _finish_job(job_id, blob_hash, result=result, error=error)
+        except Exception as e:
+            # Stays 'running': the next start_workers() requeues it
+            print(f"⚠️ Could not record the outcome of job {job_id}: {e}")
+
+def start_workers(num_workers=NUM_WORKERS):
+    """
+    Starts the worker pool once per process (later calls do nothing).
+    1. Creates the jobs table.
+    2. Requeues jobs interrupted by a restart and purges old finished jobs.
+    3. Starts num_workers daemon threads.
+    Assumes one server process per database (a second process would requeue the first one's running jobs).
+    """
+    with _start_lock:
+        if _workers:
+            return
+        init_jobs()
+        requeued = requeue_interrupted_jobs()
+        if requeued:
+            print(f"🔁 Requeued {requeued} interrupted job(s)")
+        purge_finished_jobs()
+
+        for i in range(num_workers):
+            worker = threading.Thread(target=_worker_loop, name=f"documind-worker-{i}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+        print(f"🧵 Started {num_workers} analysis worker(s)")
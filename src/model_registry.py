@@ -0,0 +1,164 @@
+import os
+import time
+import hashlib
+import threading
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+# CONFIG
+# Default classifier folder (same one train_model.py saves to)
+MODEL_DIR = os.path.join("models", "documind_v1")
+
+# Which runtime executes the classifier:
+# "torch" (eager PyTorch), "int8" (PyTorch, dynamic int8 Linear layers) or "onnx" (ONNX Runtime)
+BACKENDS = ("torch", "int8", "onnx")
+DEFAULT_BACKEND = os.environ.get("DOCUMIND_BACKEND", "torch")
+WARMUP_TEXT = "DocuMind warmup: invoice email resume report."
+
+# ==========================================
+# PROCESS-WIDE MODEL CACHE
+# ==========================================
+# Every entry point (app, inference, evaluate, batch scripts) asks the
+# registry for the classifier, so the weights are read from disk only once.
+_models = {}
+_stats = {}
+_lock = threading.Lock()
+# One lock per loaded model: the fast tokenizer cannot be used by two threads at
+# once ("Already borrowed"), so every tokenize + forward pass holds it
+_model_locks = {}
+
+
+def _registry_key(model_dir, backend):
+    return (os.path.abspath(model_dir), backend or DEFAULT_BACKEND)
+
+
+def _warmup(tokenizer, model):
+    """Runs one tiny forward pass so the first real request is not slow."""
+    inputs = tokenizer(WARMUP_TEXT, return_tensors="pt", truncation=True, max_length=32)
+    with torch.no_grad():
+        model(**inputs)
+
+
+def _load_model(model_dir, backend):
+    if backend == "onnx":
+        # Optional dependency: only needed when the ONNX backend is selected
+        try:
+            from src.onnx_backend import OnnxClassifier
+        except ImportError:
+            from onnx_backend import OnnxClassifier
+        return OnnxClassifier(model_dir)
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    if backend == "int8":
+        model = quantize_model(model)
+    return model
+
+
+def quantize_model(model):
+    """
+    Dynamic int8 quantization of every Linear layer (weights stored as int8,
+    activations quantized on the fly). Built from the trained fp32 checkpoint.
+    """
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def get_classifier(model_dir=MODEL_DIR, backend=None):
+    """
+    Returns (tokenizer, model) for the given folder and backend.
+    1. Loads the tokenizer and model the first time only.
+    2. Puts the model in eval mode.
+    3. Runs a warmup forward pass.
+    Every backend returns a model with the same call signature (model(**inputs).logits).
+    Raises OSError if the model folder (or its ONNX export) does not exist yet.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Choose one of {BACKENDS}.")
+    key = _registry_key(model_dir, backend)
+
+    # Fast path: already loaded
+    if key in _models:
+        return _models[key]
+
+    with _lock:
+        # Another thread may have loaded it while we waited
+        if key in _models:
+            return _models[key]
+
+        start = time.perf_counter()
+        tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        model = _load_model(model_dir, backend)
+        model.eval()
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _warmup(tokenizer, model)
+        warmup_seconds = time.perf_counter() - start
+
+        _models[key] = (tokenizer, model)
+        _stats[key] = {
+            "model_dir": model_dir,
+            "backend": backend,
+            "load_seconds": round(load_seconds, 3),
+            "warmup_seconds": round(warmup_seconds, 3),
+            "loaded_at": time.time(),
+            "calls": 0,
+            "documents": 0,
+            "inference_seconds": 0.0,
+        }
+        print(f"✅ Loaded {backend} classifier from {model_dir} in {load_seconds:.2f}s (warmup {warmup_seconds:.2f}s)")
+
+    return _models[key]
+
+
+def get_model_lock(model_dir=MODEL_DIR, backend=None):
+    """The lock to hold while using the (tokenizer, model) of get_classifier(model_dir, backend)."""
+    key = _registry_key(model_dir, backend)
+    with _lock:
+        return _model_locks.setdefault(key, threading.Lock())
+
+
+def model_fingerprint(model_dir=MODEL_DIR):
+    """
+    Short hash identifying one trained checkpoint (file names, sizes and mtimes).
+    Changes whenever the model is retrained or replaced.
+    """
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(model_dir)):
+        path = os.path.join(model_dir, name)
+        if os.path.isfile(path):
+            info = os.stat(path)
+            digest.update(f"{name}|{info.st_size}|{info.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def record_inference(model_dir, seconds, num_documents=1, backend=None):
+    """Adds one forward pass (covering num_documents) to the latency stats."""
+    stats = _stats.get(_registry_key(model_dir, backend))
+    if stats is None:
+        return
+    with _lock:
+        stats["calls"] += 1
+        stats["documents"] += num_documents
+        stats["inference_seconds"] += seconds
+
+
+def get_registry_stats():
+    """Returns a list of load/latency stats, one dict per loaded model."""
+    report = []
+    with _lock:
+        for stats in _stats.values():
+            row = dict(stats)
+            docs = row["documents"]
+            row["avg_ms_per_document"] = round(1000 * row["inference_seconds"] / docs, 2) if docs else 0.0
+            row["inference_seconds"] = round(row["inference_seconds"], 3)
+            report.append(row)
+    return report
+
+
+def clear_registry():
+    """Drops every cached model (e.g. after retraining into the same folder)."""
+    with _lock:
+        _models.clear()
+        _stats.clear()
@@ -0,0 +1,147 @@
+import os
+import hashlib
+import threading
+
+# CONFIG
+# OCR text is stored as one small file per image, named by content hash
+CACHE_DIR = os.path.join("data", "cache", "ocr")
+MAX_CACHE_MB = int(os.environ.get("DOCUMIND_OCR_CACHE_MB", "512"))
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+# Running totals for this process: computed by one scan on the first write (or a
+# rescan), then kept up to date by put() and _evict()
+_cache_bytes = None
+_cache_entries = None
+
+
+def cache_key(image_bytes, config=""):
+    """Hash of the raw image bytes plus the OCR settings used to read them."""
+    digest = hashlib.sha256(image_bytes)
+    digest.update(b"\0" + config.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _entry_path(key):
+    # Shard by the first two hex chars so no folder gets huge
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.txt")
+
+
+def get(key):
+    """Returns the cached text, or None on a miss. A hit marks the entry as recently used."""
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        os.utime(path) # LRU: bump last-used time
+    except OSError:
+        _stats["misses"] += 1
+        return None
+
+    _stats["hits"] += 1
+    return text
+
+
+def put(key, text):
+    """Stores text for key, then evicts least-recently-used entries if over budget."""
+    global _cache_bytes, _cache_entries
+    path = _entry_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        old_size = os.path.getsize(path) # Overwriting an entry does not add one
+    except OSError:
+        old_size = None
+
+    # Write to a temp file first so readers never see half an entry
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+    with _lock:
+        if _cache_bytes is None:
+            _refresh_totals()
+        else:
+            _cache_bytes += os.path.getsize(path) - (old_size or 0)
+            if old_size is None:
+                _cache_entries += 1
+
+        if _cache_bytes > MAX_CACHE_MB * 1024 * 1024:
+            _cache_bytes, _cache_entries = _evict(MAX_CACHE_MB * 1024 * 1024)
+
+
+def _refresh_totals():
+    """Recomputes the running totals with a full scan (call with _lock held)."""
+    global _cache_bytes, _cache_entries
+    sizes = [size for _, size, _ in _scan()]
+    _cache_bytes, _cache_entries = sum(sizes), len(sizes)
+
+
+def _scan():
+    """Yields (path, size, last_used) for every cache entry."""
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for shard in os.listdir(CACHE_DIR):
+        shard_dir = os.path.join(CACHE_DIR, shard)
+        if not os.path.isdir(shard_dir):
+            continue
+        for name in os.listdir(shard_dir):
+            if not name.endswith(".txt"):
+                continue
+            path = os.path.join(shard_dir, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue # Removed by another process
+            yield path, info.st_size, info.st_mtime
+
+
+def _evict(max_bytes):
+    """Deletes the oldest entries until the cache is back under 90% of max_bytes. Returns (bytes, entries) left."""
+    entries = sorted(_scan(), key=lambda entry: entry[2])
+    total = sum(size for _, size, _ in entries)
+    count = len(entries)
+    target = int(max_bytes * 0.9)
+
+    for path, size, _ in entries:
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            count -= 1
+        except OSError:
+            pass
+    return total, count
+
+
+def cached_ocr(image_bytes, ocr_fn, config=""):
+    """
+    Returns the OCR text for image_bytes, only calling ocr_fn on a cache miss.
+    ocr_fn receives the raw bytes and must return a string.
+    """
+    key = cache_key(image_bytes, config)
+    text = get(key)
+    if text is None:
+        text = ocr_fn(image_bytes)
+        put(key, text)
+    return text
+
+
+def get_cache_stats(rescan=False):
+    """
+    Hit/miss counts for this process plus the size of the cache, from the running totals
+    (no disk walk). entries / size_mb are None until this process wrote an entry;
+    rescan=True walks the whole cache to (re)compute them.
+    """
+    with _lock:
+        if rescan:
+            _refresh_totals()
+        entries, size = _cache_entries, _cache_bytes
+    return {
+        "entries": entries,
+        "size_mb": round(size / (1024 * 1024), 2) if size is not None else None,
+        "max_mb": MAX_CACHE_MB,
+        "hits": _stats["hits"],
+        "misses": _stats["misses"],
+    }
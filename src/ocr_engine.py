@@ -4,6 +4,12 @@
 import pytesseract  
 from PIL import Image # Python Imaging Library
 import os
+import io
+
+try:
+    from src import ocr_cache
+except ImportError:
+    import ocr_cache
 
 # ==========================================
 # WINDOWS CONFIGURATION (THE MAGIC LINE)
@@ -16,21 +22,40 @@ import os
 
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
+# Tesseract options. Part of the cache key, so changing them re-runs OCR.
+OCR_CONFIG = ""
+
 # ==========================================
 
-def extract_text(image_path):
+def _tesseract(image_bytes):
+    # 1. Load the image
+    img = Image.open(io.BytesIO(image_bytes))
+
+    # 2. Convert to text using Tesseract
+    return pytesseract.image_to_string(img, config=OCR_CONFIG)
+
+def ocr_image(image_path, use_cache=True):
+    """
+    Returns the text of the image at image_path.
+    Results are cached by image content, so the same scan is never OCR'd twice.
+    Raises on unreadable images.
+    """
+    with open(image_path, "rb") as f:
+        image_bytes = f.read()
+    return ocr_bytes(image_bytes, use_cache=use_cache)
+
+def ocr_bytes(image_bytes, use_cache=True):
+    """Same as ocr_image, for an image that is already in memory."""
+    if not use_cache:
+        return _tesseract(image_bytes)
+    return ocr_cache.cached_ocr(image_bytes, _tesseract, OCR_CONFIG)
+
+def extract_text(image_path, use_cache=True):
     """
     Reads an image from the path and returns the text string.
     """
     try:
-        # 1. Load the image
-        img = Image.open(image_path)
-        
-        # 2. Convert to text using Tesseract
-        # custom_config allows us to handle simple layouts better
-        text = pytesseract.image_to_string(img)
-        
-        return text
+        return ocr_image(image_path, use_cache=use_cache)
     
     except Exception as e:
         print(f"Error processing {image_path}: {e}")
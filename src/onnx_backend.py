@@ -0,0 +1,127 @@
+import os
+import argparse
+import numpy as np
+import torch
+from types import SimpleNamespace
+from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+
+# CONFIG
+MODEL_DIR = os.path.join("models", "documind_v1")
+ONNX_FILENAME = os.path.join("onnx", "model.onnx") # Stored inside the model folder
+OPSET_VERSION = 17
+
+# Sample inputs used to check that ONNX and PyTorch agree
+VERIFY_TEXTS = [
+    "INVOICE No. 4471 Total due: $1,250.00 Payment terms net 30 days.",
+    "From: John Smith Subject: Meeting notes Please find attached the agenda.",
+    "Curriculum Vitae. Experience: Software engineer at Acme Corp, 2015-2020.",
+]
+
+
+def onnx_path(model_dir=MODEL_DIR):
+    return os.path.join(model_dir, ONNX_FILENAME)
+
+
+def _import_onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError:
+        raise ImportError("❌ onnxruntime is not installed. Run: pip install onnxruntime")
+    return onnxruntime
+
+
+class OnnxClassifier:
+    """
+    Runs the exported classifier with ONNX Runtime.
+    Behaves like the PyTorch model for our code: model(**inputs).logits and model.config.
+    """
+    def __init__(self, model_dir=MODEL_DIR, num_threads=None):
+        ort = _import_onnxruntime()
+        path = onnx_path(model_dir)
+        if not os.path.exists(path):
+            raise OSError(f"ONNX model not found at {path}. Run: python src/onnx_backend.py")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.config = AutoConfig.from_pretrained(model_dir)
+
+    def eval(self):
+        # Nothing to do: ONNX graphs are always in inference mode
+        return self
+
+    def __call__(self, **inputs):
+        feed = {name: inputs[name].cpu().numpy().astype(np.int64) for name in self.input_names}
+        logits = self.session.run(["logits"], feed)[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+
+def export_to_onnx(model_dir=MODEL_DIR):
+    """Exports the trained classifier to <model_dir>/onnx/model.onnx with dynamic batch/sequence axes."""
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    model.eval()
+
+    sample = tokenizer(VERIFY_TEXTS, return_tensors="pt", padding=True, truncation=True, max_length=512)
+    input_names = [name for name in tokenizer.model_input_names if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    path = onnx_path(model_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=OPSET_VERSION,
+            dynamo=False, # Classic exporter: no onnxscript dependency
+        )
+
+    print(f"💾 ONNX model saved to: {path}")
+    return path
+
+
+def verify_export(model_dir=MODEL_DIR, atol=1e-4):
+    """
+    Runs the same texts through PyTorch and ONNX Runtime.
+    Returns (max_abs_diff, labels_match).
+    """
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    torch_model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    torch_model.eval()
+    onnx_model = OnnxClassifier(model_dir)
+
+    inputs = tokenizer(VERIFY_TEXTS, return_tensors="pt", padding=True, truncation=True, max_length=512)
+    with torch.no_grad():
+        expected = torch_model(**inputs).logits
+    actual = onnx_model(**inputs).logits
+
+    max_diff = (expected - actual).abs().max().item()
+    labels_match = torch.equal(expected.argmax(-1), actual.argmax(-1))
+
+    if max_diff <= atol and labels_match:
+        print(f"✅ ONNX matches PyTorch (max |diff| = {max_diff:.2e})")
+    else:
+        print(f"❌ ONNX output differs from PyTorch (max |diff| = {max_diff:.2e}, labels match: {labels_match})")
+    return max_diff, labels_match
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the DocuMind classifier to ONNX and verify it.")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--atol", type=float, default=1e-4, help="Max allowed difference between logits")
+    args = parser.parse_args()
+
+    export_to_onnx(args.model_dir)
+    max_diff, labels_match = verify_export(args.model_dir, atol=args.atol)
+    if max_diff > args.atol or not labels_match:
+        raise SystemExit(1)
@@ -1,12 +1,171 @@
-from transformers import pipeline
+import re
+import time
+import hashlib
+import threading
+import numpy as np
 
-# Load a lighter summarization model (DistilBART) - NO CHANGE TO MODEL
-summarizer = pipeline("summarization", model="sshleifer/distilbart-cnn-12-6")
+try:
+    from src.utils import get_cached_summary, put_cached_summary
+except ImportError:
+    from utils import get_cached_summary, put_cached_summary
 
-def generate_summary(text):
+# Lighter summarization model (DistilBART) - NO CHANGE TO MODEL
+SUMMARIZER_MODEL = "sshleifer/distilbart-cnn-12-6"
+
+# ==========================================
+# LAZY LOADING
+# ==========================================
+# The model is loaded on first use (or by preload_summarizer), not at import,
+# so importing this module costs nothing.
+_summarizer = None
+_lock = threading.Lock()
+# The pipeline's fast tokenizer is shared and its truncation settings change per call,
+# so only one thread may tokenize / generate at a time ("Already borrowed" otherwise)
+_generate_lock = threading.Lock()
+_preload_thread = None
+_status = {"state": "not_loaded", "load_seconds": None, "error": None}
+
+def get_summarizer():
+    """Returns the summarization pipeline, loading it the first time."""
+    global _summarizer
+    if _summarizer is not None:
+        return _summarizer
+
+    with _lock:
+        # Another thread (e.g. the preloader) may have finished while we waited
+        if _summarizer is not None:
+            return _summarizer
+
+        _status["state"] = "loading"
+        start = time.perf_counter()
+        try:
+            from transformers import pipeline
+            _summarizer = pipeline("summarization", model=SUMMARIZER_MODEL)
+        except Exception as e:
+            _status.update(state="error", error=f"{type(e).__name__}: {e}")
+            raise
+
+        _status.update(state="ready", load_seconds=round(time.perf_counter() - start, 2), error=None)
+    return _summarizer
+
+def preload_summarizer():
+    """Starts loading the model in a background thread. Safe to call on every rerun."""
+    global _preload_thread
+    if _summarizer is not None or (_preload_thread is not None and _preload_thread.is_alive()):
+        return
+
+    def _load():
+        try:
+            get_summarizer()
+        except Exception:
+            pass # Recorded in _status; generate_summary will report it
+
+    _preload_thread = threading.Thread(target=_load, name="summarizer-preload", daemon=True)
+    _preload_thread.start()
+
+def summarizer_status():
+    """{"state": not_loaded | loading | ready | error, "load_seconds", "error"}"""
+    return dict(_status)
+
+# ==========================================
+# LONG DOCUMENTS (MAP-REDUCE)
+# ==========================================
+def split_windows(tokenizer, text, window_tokens=1000, overlap=100, max_windows=8):
+    """
+    Splits text into overlapping token windows.
+    If there would be more than max_windows, windows are picked evenly across
+    the whole document, so the cost stays bounded without ignoring the end.
+    """
+    ids = tokenizer.encode(text, add_special_tokens=False)
+    if len(ids) <= window_tokens:
+        return [text]
+
+    step = window_tokens - overlap
+    starts = list(range(0, len(ids) - overlap, step))
+    if len(starts) > max_windows:
+        if max_windows > 1:
+            starts = [starts[round(i * (len(starts) - 1) / (max_windows - 1))] for i in range(max_windows)]
+        else:
+            starts = starts[:1]
+
+    return [tokenizer.decode(ids[start:start + window_tokens]) for start in starts]
+
+def summarize_windows(summarizer, windows, max_length=120, min_length=30):
+    """Summarizes every window with ONE batched generate call. Returns the partial summaries."""
+    tokenizer, model = summarizer.tokenizer, summarizer.model
+    inputs = tokenizer(windows, return_tensors="pt", padding=True, truncation=True, max_length=1024)
+    inputs = {key: value.to(model.device) for key, value in inputs.items()}
+
+    output_ids = model.generate(**inputs, max_length=max_length, min_length=min_length, do_sample=False)
+    return [summary.strip() for summary in tokenizer.batch_decode(output_ids, skip_special_tokens=True)]
+
+# ==========================================
+# EXTRACTIVE MODE (bulk backfills)
+# ==========================================
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'(])')
+
+def split_sentences(cleaned_text, fallback_words=25):
+    """Splits on sentence punctuation. OCR text without punctuation is cut into ~25-word pieces."""
+    sentences = [s.strip() for s in SENTENCE_SPLIT.split(cleaned_text) if len(s.split()) >= 3]
+    if len(sentences) < 2:
+        words = cleaned_text.split()
+        sentences = [' '.join(words[i:i + fallback_words]) for i in range(0, len(words), fallback_words)]
+    return sentences
+
+def extractive_summary(cleaned_text, num_sentences=3, damping=0.85, iterations=30):
+    """
+    TextRank-style summary: no neural model, runs in milliseconds.
+    1. TF-IDF vector per sentence.
+    2. Cosine similarity between all sentences (one matrix product).
+    3. Power iteration for the centrality of each sentence.
+    4. The top sentences, in their original order.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    sentences = split_sentences(cleaned_text)
+    if len(sentences) <= num_sentences:
+        return ' '.join(sentences)
+
+    try:
+        tfidf = TfidfVectorizer(stop_words='english').fit_transform(sentences)
+    except ValueError:
+        # Only stop words / no usable vocabulary
+        return ' '.join(sentences[:num_sentences])
+
+    # Rows are L2-normalised, so X @ X.T is the cosine similarity
+    similarity = (tfidf @ tfidf.T).toarray()
+    np.fill_diagonal(similarity, 0.0)
+
+    # Row-normalise into a transition matrix (isolated sentences link to everyone)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    n = len(sentences)
+    transition = np.divide(similarity, row_sums, out=np.full_like(similarity, 1.0 / n), where=row_sums > 0)
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        scores = (1 - damping) / n + damping * (transition.T @ scores)
+
+    top = sorted(np.argsort(-scores)[:num_sentences])
+    return ' '.join(sentences[i] for i in top)
+
+# Generation settings used below. Part of the cache key, so changing them invalidates old summaries.
+GENERATION_PARAMS = "max_length=180|min_length=50|do_sample=False"
+
+def summary_cache_key(cleaned_text, long_document=False, max_windows=8, window_overlap=100):
+    """Hash of the cleaned text plus model and generation settings."""
+    settings = f"{SUMMARIZER_MODEL}|{GENERATION_PARAMS}|long={long_document}|windows={max_windows}|overlap={window_overlap}"
+    digest = hashlib.sha256(settings.encode("utf-8"))
+    digest.update(b"\0" + cleaned_text.encode("utf-8"))
+    return digest.hexdigest()
+
+def generate_summary(text, long_document=False, max_windows=8, window_overlap=100, use_cache=True, mode="abstractive"):
     """
     Summarizes long document text into a short paragraph.
     Includes text cleaning for better OCR processing.
+    mode: "abstractive" (DistilBART) or "extractive" (top sentences, milliseconds, no model load).
+    long_document: summarize every part of the text (map-reduce) instead of only
+    the first ~1000 tokens. max_windows caps the number of windows (and latency).
+    use_cache: reuse the stored summary of identical (cleaned) text from documind.db.
     """
     
     # 1. ROBUST TEXT CLEANING AND PRE-PROCESSING
@@ -25,39 +184,65 @@ def generate_summary(text):
     if len(cleaned_text.split()) < 50:
         return "Document is too short to summarize (less than 50 words)."
 
+    # Extractive mode is cheaper than a cache lookup, so it skips the cache
+    if mode == "extractive":
+        return extractive_summary(cleaned_text)
+    if mode != "abstractive":
+        return f"Error generating summary: unknown mode '{mode}'"
+
     # 3. ACCURATE TOKEN CHUNKING
     
     # The model has a 1024 token limit. We use the tokenizer to accurately chunk the input.
     max_token_limit = 1000 
 
+    # Same text + same settings = same summary, so check the cache first
+    cache_key = summary_cache_key(cleaned_text, long_document, max_windows, window_overlap)
+    if use_cache:
+        cached = get_cached_summary(cache_key)
+        if cached is not None:
+            return cached
+
     try:
-        # Encode the clean text, automatically truncate if longer than the limit
-        input_ids = summarizer.tokenizer.encode(
-            cleaned_text, 
-            return_tensors='pt', 
-            truncation=True, 
-            max_length=max_token_limit
-        )
+        summarizer = get_summarizer()
+
+        with _generate_lock:
+            # Long-document mode: summarize each window (map), then summarize
+            # the joined partial summaries below like a normal document (reduce)
+            if long_document:
+                windows = split_windows(summarizer.tokenizer, cleaned_text, max_token_limit, window_overlap, max_windows)
+                if len(windows) > 1:
+                    cleaned_text = ' '.join(summarize_windows(summarizer, windows))
+
+            # Encode the clean text, automatically truncate if longer than the limit
+            input_ids = summarizer.tokenizer.encode(
+                cleaned_text, 
+                return_tensors='pt', 
+                truncation=True, 
+                max_length=max_token_limit
+            )
         
-        # Decode the chunked tokens back into a string for the pipeline
-        input_text = summarizer.tokenizer.decode(input_ids[0], skip_special_tokens=True)
+            # Decode the chunked tokens back into a string for the pipeline
+            input_text = summarizer.tokenizer.decode(input_ids[0], skip_special_tokens=True)
 
-        # 4. GENERATE SUMMARY (with adjusted length parameters for slightly longer output)
+            # 4. GENERATE SUMMARY (with adjusted length parameters for slightly longer output)
         
-        # Increased max_length from 130 to 180 and min_length from 30 to 50
-        summary_output = summarizer(
-            input_text, 
-            max_length=180, 
-            min_length=50, 
-            do_sample=False,
-            # Added a hint to improve coherence
-            # Note: This parameter is model-specific and might not exist on all models
-            # but is sometimes supported by the pipeline API.
-            # early_stopping=True 
-        )
+            # Increased max_length from 130 to 180 and min_length from 30 to 50
+            summary_output = summarizer(
+                input_text, 
+                max_length=180, 
+                min_length=50, 
+                do_sample=False,
+                # Added a hint to improve coherence
+                # Note: This parameter is model-specific and might not exist on all models
+                # but is sometimes supported by the pipeline API.
+                # early_stopping=True 
+            )
         
         # 5. CLEAN THE OUTPUT (Removing leading/trailing spaces/newlines from model output)
         final_summary = summary_output[0]['summary_text'].strip()
+
+        if use_cache:
+            put_cached_summary(cache_key, final_summary)
         
         return final_summary
     
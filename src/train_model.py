@@ -1,13 +1,22 @@
 import mlflow
 import os
+import time
+import shutil
+import hashlib
+import argparse
 import pandas as pd
 import torch
 import numpy as np
 os.environ["MLFLOW_EXPERIMENT_NAME"] = "DocuMind_Experiments"
 os.environ["HF_MLFLOW_LOG_ARTIFACTS"] = "TRUE"
 from sklearn.metrics import accuracy_score, precision_recall_fscore_support
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, Trainer, TrainingArguments, DataCollatorWithPadding
-from datasets import Dataset, ClassLabel
+from transformers import AutoTokenizer, AutoModelForSequenceClassification, Trainer, TrainingArguments, DataCollatorWithPadding, TrainerCallback
+from datasets import Dataset, ClassLabel, load_from_disk
+
+try:
+    from src.dataset_store import has_parquet, load_hf_dataset, is_tokenized_for, dataset_files
+except ImportError:
+    from dataset_store import has_parquet, load_hf_dataset, is_tokenized_for, dataset_files
 
 # 1. SETUP CONFIGURATION
 # ======================
@@ -15,6 +24,87 @@ from datasets import Dataset, ClassLabel
 MODEL_NAME = "distilbert-base-uncased"
 DATA_PATH = os.path.join("data", "processed", "documind_dataset.csv")
 OUTPUT_DIR = os.path.join("models", "documind_v1")
+MAX_LENGTH = 512
+
+# Tokenized datasets are saved here, keyed by data file hash + tokenizer
+TOKENIZED_CACHE_DIR = os.path.join("data", "cache", "tokenized")
+
+def _cache_key(data_files, tokenizer_name, max_length):
+    """Hash of the raw data files plus the tokenizer settings."""
+    digest = hashlib.sha256(f"{tokenizer_name}|{max_length}".encode("utf-8"))
+    for path in data_files:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+def tokenize_with_cache(dataset, tokenizer, data_files, max_length=MAX_LENGTH):
+    """
+    Tokenizes the dataset WITHOUT padding (the collator pads each batch).
+    The result is saved to disk, so the next run with the same data and
+    tokenizer loads it instead of tokenizing again.
+    """
+    key = _cache_key(data_files, tokenizer.name_or_path, max_length)
+    cache_path = os.path.join(TOKENIZED_CACHE_DIR, key)
+
+    if os.path.exists(cache_path):
+        print(f"⚡ Loading tokenized dataset from cache: {cache_path}")
+        return load_from_disk(cache_path)
+
+    def preprocess_function(examples):
+        # DistilBERT only needs the text, no bounding boxes!
+        return tokenizer(examples["text"], truncation=True, max_length=max_length)
+
+    print("⚙️ Tokenizing data...")
+    tokenized = dataset.map(preprocess_function, batched=True)
+
+    # Save into a temp folder first so an interrupted run never leaves a broken cache
+    tmp_path = cache_path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tokenized.save_to_disk(tmp_path)
+    os.replace(tmp_path, cache_path)
+    print(f"💾 Tokenized dataset cached to: {cache_path}")
+
+    return load_from_disk(cache_path)
+
+class PaddingStatsCollator:
+    """
+    Wraps a collator and counts real vs padded tokens in every batch it builds.
+    """
+    def __init__(self, collator):
+        self.collator = collator
+        self.reset()
+
+    def reset(self):
+        self.real_tokens = 0
+        self.padded_tokens = 0
+
+    def __call__(self, features):
+        batch = self.collator(features)
+        mask = batch["attention_mask"]
+        self.real_tokens += int(mask.sum())
+        self.padded_tokens += mask.numel()
+        return batch
+
+class ThroughputCallback(TrainerCallback):
+    """Prints (and logs to MLflow) the padding ratio and tokens/sec of each epoch."""
+    def __init__(self, stats):
+        self.stats = stats
+        self.epoch_start = None
+
+    def on_epoch_begin(self, args, state, control, **kwargs):
+        self.stats.reset()
+        self.epoch_start = time.perf_counter()
+
+    def on_epoch_end(self, args, state, control, **kwargs):
+        elapsed = time.perf_counter() - self.epoch_start
+        padded = self.stats.padded_tokens
+        padding_ratio = 1 - self.stats.real_tokens / padded if padded else 0.0
+        tokens_per_sec = self.stats.real_tokens / elapsed if elapsed else 0.0
+
+        print(f"📏 Epoch {state.epoch:.0f}: padding ratio {padding_ratio:.1%}, {tokens_per_sec:,.0f} tokens/sec")
+        if mlflow.active_run():
+            mlflow.log_metrics({"padding_ratio": padding_ratio, "tokens_per_sec": tokens_per_sec}, step=round(state.epoch))
 
 def compute_metrics(pred):
     labels = pred.label_ids
@@ -28,23 +118,34 @@ def compute_metrics(pred):
         'recall': recall
     }
 
-def main():
+def main(group_by_length=False):
     # Check device
     device = "cuda" if torch.cuda.is_available() else "cpu"
     print(f"🚀 Training on: {device.upper()}")
 
     # 1. Load Data
     print("⏳ Loading Dataset...")
-    if not os.path.exists(DATA_PATH):
-        raise FileNotFoundError(f"❌ File not found: {DATA_PATH}")
-    
-    df = pd.read_csv(DATA_PATH)
-    
-    # Remove empty rows
-    df = df.dropna(subset=['text'])
+    if has_parquet():
+        # Memory-mapped Arrow: rows stay on disk until a batch needs them
+        data_files = dataset_files()
+        dataset = load_hf_dataset()
+        dataset = dataset.filter(lambda batch: [bool(t) for t in batch["text"]], batched=True)
+        label_list = dataset.unique("category")
+    else:
+        if not os.path.exists(DATA_PATH):
+            raise FileNotFoundError(f"❌ File not found: {DATA_PATH}")
+        
+        data_files = [DATA_PATH]
+        df = pd.read_csv(DATA_PATH)
+        
+        # Remove empty rows
+        df = df.dropna(subset=['text'])
+        label_list = df['category'].unique().tolist()
+        
+        # Convert to Hugging Face Dataset
+        dataset = Dataset.from_pandas(df)
     
     # Create Labels
-    label_list = df['category'].unique().tolist()
     label_list.sort() # Ensure consistent order
     num_labels = len(label_list)
     
@@ -54,25 +155,25 @@ def main():
     
     print(f"✅ Categories found: {label_list}")
     
-    # Map text categories to numbers in the dataframe
-    df['label'] = df['category'].map(label2id)
+    # Map text categories to numbers
+    dataset = dataset.map(lambda batch: {"label": [label2id[c] for c in batch["category"]]}, batched=True)
     
-    # Convert to Hugging Face Dataset
-    dataset = Dataset.from_pandas(df)
-    
-    # Split: 80% Train, 20% Test
-    dataset = dataset.train_test_split(test_size=0.2)
-    
-    # 2. Tokenization
+    # 2. Tokenization (no padding here: DataCollatorWithPadding pads per batch)
     print(f"⬇️ Loading {MODEL_NAME}...")
     tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+
+    if is_tokenized_for(MODEL_NAME, MAX_LENGTH):
+        # input_ids/attention_mask were stored by create_dataset.py --tokenizer
+        print("⚡ Using pre-tokenized columns from the Parquet dataset")
+    else:
+        dataset = tokenize_with_cache(dataset, tokenizer, data_files)
     
-    def preprocess_function(examples):
-        # DistilBERT only needs the text, no bounding boxes!
-        return tokenizer(examples["text"], truncation=True, padding="max_length", max_length=512)
+    if group_by_length:
+        # Precomputed lengths so the sampler doesn't have to scan the dataset
+        dataset = dataset.map(lambda batch: {"length": [len(ids) for ids in batch["input_ids"]]}, batched=True)
 
-    print("⚙️ Tokenizing data...")
-    tokenized_datasets = dataset.map(preprocess_function, batched=True)
+    # Split: 80% Train, 20% Test
+    tokenized_datasets = dataset.train_test_split(test_size=0.2)
 
     # 3. Model Setup
     model = AutoModelForSequenceClassification.from_pretrained(
@@ -93,7 +194,11 @@ def main():
         eval_strategy="epoch",
         save_strategy="epoch",
         load_best_model_at_end=True,
+        # Opt-in: batch documents of similar length together (still reshuffled every epoch)
+        group_by_length=group_by_length,
+        length_column_name="length",
     )
+    padding_stats = PaddingStatsCollator(DataCollatorWithPadding(tokenizer=tokenizer))
 
     # 5. Initialize Trainer
     trainer = Trainer(
@@ -102,8 +207,9 @@ def main():
         train_dataset=tokenized_datasets["train"],
         eval_dataset=tokenized_datasets["test"],
         tokenizer=tokenizer,
-        data_collator=DataCollatorWithPadding(tokenizer=tokenizer),
+        data_collator=padding_stats,
         compute_metrics=compute_metrics,
+        callbacks=[ThroughputCallback(padding_stats)],
     )
 
     # 6. Train
@@ -116,4 +222,8 @@ def main():
     print(f"🎉 Model saved to {OUTPUT_DIR}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fine-tune DistilBERT on the DocuMind dataset.")
+    parser.add_argument("--group-by-length", action="store_true", help="Batch documents of similar token length together")
+    args = parser.parse_args()
+
+    main(group_by_length=args.group_by_length)
\ No newline at end of file
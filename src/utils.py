@@ -1,67 +1,611 @@
 import sqlite3
 import datetime
+import hashlib
+import json
+import threading
 import pandas as pd
 import os
+from contextlib import contextmanager
 
 DB_NAME = "documind.db"
 
+# Applied once to every new connection
+DB_PRAGMAS = {
+    "journal_mode": "WAL",   # Readers no longer block the writer (and vice versa)
+    "synchronous": "NORMAL", # Safe with WAL: fsync at checkpoints, not every commit
+    "cache_size": -65536,    # 64 MB page cache (negative = KiB)
+    "mmap_size": 268435456,  # 256 MB of the file read through mmap
+    "busy_timeout": 5000,    # Wait up to 5 s for a lock instead of failing at once
+    "temp_store": "MEMORY",
+}
+
+# Summary cache limits (oldest-used entries are evicted first)
+SUMMARY_CACHE_MAX_ENTRIES = 5000
+SUMMARY_CACHE_MAX_MB = 50
+
+# Filtered history counts stop here (the page shows "10,000+")
+HISTORY_COUNT_CAP = 10000
+
+# --- CONNECTION MANAGER ---
+# One connection per thread, opened on first use and then reused.
+# (sqlite3 connections must not be shared between threads.)
+# Reuse pays off in long-lived threads (job workers, batch scripts); Streamlit
+# runs every rerun on a new script thread, so there it is one connection per rerun.
+_local = threading.local()
+
+def get_connection():
+    """Returns this thread's connection to DB_NAME, with WAL and the tuned pragmas."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.db_name != DB_NAME:
+        # isolation_level=None: no implicit BEGIN; transaction() controls every transaction itself
+        conn = sqlite3.connect(DB_NAME, timeout=DB_PRAGMAS["busy_timeout"] / 1000, isolation_level=None)
+        for name, value in DB_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        _local.conn = conn
+        _local.db_name = DB_NAME
+    return conn
+
+@contextmanager
+def transaction():
+    """
+    with transaction() as c: ...
+    The whole block (reads, writes and DDL) runs under BEGIN IMMEDIATE, i.e. holding
+    the write lock from the first statement, so read-then-write sequences are atomic.
+    Commits when the block succeeds, rolls back if it raises.
+    Nested calls join the outer transaction.
+    """
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn.cursor()
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn.cursor()
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+def close_connection():
+    """Closes this thread's connection (e.g. at the end of a batch script)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
 # --- DATABASE FUNCTIONS ---
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS documents
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  upload_date TIMESTAMP,
-                  filename TEXT,
-                  file_blob BLOB,
-                  file_type TEXT,
-                  category TEXT,
-                  confidence REAL,
-                  extracted_text TEXT,
-                  summary TEXT)''')
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute('''CREATE TABLE IF NOT EXISTS documents
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      upload_date TIMESTAMP,
+                      filename TEXT,
+                      blob_hash TEXT,
+                      file_type TEXT,
+                      category TEXT,
+                      confidence REAL,
+                      extracted_text TEXT,
+                      summary TEXT,
+                      fields TEXT)''')
+        _add_missing_columns(c)
+        # History is always read newest-first; id breaks ties for keyset pagination
+        c.execute("CREATE INDEX IF NOT EXISTS idx_documents_upload_date ON documents(upload_date, id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_documents_category ON documents(category, upload_date, id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_documents_confidence ON documents(confidence)")
+        # Lets batch ingest skip files that are already archived
+        c.execute("CREATE INDEX IF NOT EXISTS idx_documents_blob_hash ON documents(blob_hash)")
+        _create_blob_store(c)
+        _create_summary_cache(c)
+        _create_category_counts(c)
+    _migrate_file_blobs()
+    _create_search_index()
+    start_search_backfill()
+
+# Columns added after the first release: (name, type)
+ADDED_COLUMNS = [("blob_hash", "TEXT"), ("fields", "TEXT")]
+
+def _add_missing_columns(c):
+    columns = [row[1] for row in c.execute("PRAGMA table_info(documents)")]
+    for name, col_type in ADDED_COLUMNS:
+        if name not in columns:
+            c.execute(f"ALTER TABLE documents ADD COLUMN {name} {col_type}")
+
+def _insert_documents(c, records):
+    """
+    records: dicts with filename, file_bytes, file_type, category, confidence, text, summary
+    (optional: upload_date, fields = dict of extracted fields, stored as JSON).
+    """
+    now = datetime.datetime.now()
+    rows = []
+    for r in records:
+        fields = json.dumps(r["fields"]) if r.get("fields") is not None else None
+        rows.append((r.get("upload_date") or now, r["filename"], _put_blob(c, r["file_bytes"]), r.get("file_type"),
+                     r["category"], r["confidence"], r["text"], r["summary"], fields))
+    c.executemany('''INSERT INTO documents 
+                     (upload_date, filename, blob_hash, file_type, category, confidence, extracted_text, summary, fields)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', rows)
 
 def save_to_db(uploaded_file, category, confidence, text, summary):
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
         uploaded_file.seek(0)
-        file_bytes = uploaded_file.read()
-        current_time = datetime.datetime.now()
-        c.execute('''INSERT INTO documents 
-                     (upload_date, filename, file_blob, file_type, category, confidence, extracted_text, summary)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', 
-                  (current_time, uploaded_file.name, file_bytes, uploaded_file.type, category, confidence, text, summary))
-        conn.commit()
-        conn.close()
+        record = {
+            "filename": uploaded_file.name,
+            "file_bytes": uploaded_file.read(),
+            "file_type": uploaded_file.type,
+            "category": category,
+            "confidence": confidence,
+            "text": text,
+            "summary": summary,
+        }
+        with transaction() as c:
+            _insert_documents(c, [record])
         return "✅ Document saved to Database!"
     except Exception as e:
         return f"❌ DB Error: {e}"
 
+def save_many_to_db(records, batch_size=500):
+    """
+    Batched insert for scripts: one executemany + one commit per batch_size records.
+    records: iterable of dicts (see _insert_documents). Returns the number of rows written.
+    """
+    written = 0
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            with transaction() as c:
+                _insert_documents(c, batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        with transaction() as c:
+            _insert_documents(c, batch)
+        written += len(batch)
+    return written
+
 def get_db_history():
-    conn = sqlite3.connect(DB_NAME)
     query = "SELECT id, upload_date, filename, category, confidence, summary FROM documents ORDER BY upload_date DESC"
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+    return pd.read_sql_query(query, get_connection())
+
+# --- PAGINATED HISTORY ---
+HISTORY_COLUMNS = ["id", "upload_date", "filename", "category", "confidence", "summary"]
+
+def _history_filters(filters):
+    """
+    Turns a filters dict into (WHERE clauses, params). Supported keys:
+    category, date_from, date_to (datetime.date, inclusive), min_confidence, max_confidence.
+    """
+    filters = filters or {}
+    clauses, params = [], []
+    if filters.get("category"):
+        clauses.append("category = ?")
+        params.append(filters["category"])
+    if filters.get("date_from"):
+        clauses.append("upload_date >= ?")
+        params.append(filters["date_from"].isoformat())
+    if filters.get("date_to"):
+        # Stored as 'YYYY-MM-DD HH:MM:SS', so "before the next day" includes the whole day
+        clauses.append("upload_date < ?")
+        params.append((filters["date_to"] + datetime.timedelta(days=1)).isoformat())
+    if filters.get("min_confidence") is not None:
+        clauses.append("confidence >= ?")
+        params.append(filters["min_confidence"])
+    if filters.get("max_confidence") is not None:
+        clauses.append("confidence <= ?")
+        params.append(filters["max_confidence"])
+    return clauses, params
+
+def get_history_page(filters=None, limit=50, after=None):
+    """
+    One page of history, newest first.
+    Keyset pagination: 'after' is the cursor returned with the previous page, so
+    every page is an index seek (no OFFSET scan), however deep you go.
+    Returns (DataFrame, next_cursor); next_cursor is None on the last page.
+    """
+    clauses, params = _history_filters(filters)
+    if after is not None:
+        clauses.append("(upload_date, id) < (?, ?)")
+        params.extend(after)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    # One extra row tells us whether there is a next page
+    rows = get_connection().execute(
+        f"SELECT {', '.join(HISTORY_COLUMNS)} FROM documents {where} "
+        f"ORDER BY upload_date DESC, id DESC LIMIT ?", params + [limit + 1]).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1][1], rows[-1][0])
+    return pd.DataFrame(rows, columns=HISTORY_COLUMNS), next_cursor
+
+def count_history(filters=None, cap=HISTORY_COUNT_CAP):
+    """
+    Number of documents matching the filters.
+    No filter / category only: exact, read from category_counts (no scan).
+    Date / confidence filters: an index range count, so the cost grows with the matches,
+    not the archive; it stops at cap + 1 (anything above cap means "more than cap").
+    """
+    filters = filters or {}
+    clauses, params = _history_filters(filters)
+    if _history_filters(dict(filters, category=None))[0]:
+        where = " AND ".join(clauses)
+        return get_connection().execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM documents WHERE {where} LIMIT ?)", params + [cap + 1]).fetchone()[0]
+    counts = get_category_counts()
+    if filters.get("category"):
+        return counts.get(filters["category"], 0)
+    return sum(counts.values())
+
+def get_category_counts():
+    """{category: documents}, kept up to date by triggers (one small read, however big the archive)."""
+    rows = get_connection().execute("SELECT category, documents FROM category_counts WHERE documents > 0 ORDER BY category").fetchall()
+    return dict(rows)
+
+def _create_category_counts(c):
+    """
+    Per-category document counts, maintained by triggers on documents.
+    Created and seeded inside init_db's transaction, so the seed and the triggers appear together.
+    (A missing category is counted under ''.)
+    """
+    if c.execute("SELECT name FROM sqlite_master WHERE name = 'category_counts'").fetchone():
+        return
+    c.execute("CREATE TABLE category_counts (category TEXT PRIMARY KEY, documents INTEGER NOT NULL)")
+    c.execute('''INSERT INTO category_counts
+                 SELECT IFNULL(category, ''), COUNT(*) FROM documents GROUP BY IFNULL(category, '')''')
+    add_one = '''INSERT INTO category_counts VALUES (IFNULL(new.category, ''), 1)
+                 ON CONFLICT(category) DO UPDATE SET documents = documents + 1;'''
+    remove_one = "UPDATE category_counts SET documents = documents - 1 WHERE category = IFNULL(old.category, '');"
+    c.execute(f"CREATE TRIGGER category_counts_ai AFTER INSERT ON documents BEGIN {add_one} END")
+    c.execute(f"CREATE TRIGGER category_counts_ad AFTER DELETE ON documents BEGIN {remove_one} END")
+    c.execute(f"CREATE TRIGGER category_counts_au AFTER UPDATE OF category ON documents BEGIN {remove_one} {add_one} END")
+
+def get_recent_confidence(limit=500):
+    """Confidence of the last `limit` documents, oldest first (for trend charts)."""
+    rows = get_connection().execute(
+        "SELECT upload_date, confidence FROM documents ORDER BY upload_date DESC, id DESC LIMIT ?", (limit,)).fetchall()
+    return pd.DataFrame(rows[::-1], columns=["upload_date", "confidence"])
 
 def delete_db_entries(ids_to_delete):
     """Deletes rows from the database based on a list of IDs."""
     try:
         if not ids_to_delete: return False
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        # Safe parameterized query
-        query = f"DELETE FROM documents WHERE id IN ({','.join(['?']*len(ids_to_delete))})"
-        c.execute(query, ids_to_delete)
-        conn.commit()
-        conn.close()
+        with transaction() as c:
+            # Safe parameterized query
+            placeholders = ','.join(['?']*len(ids_to_delete))
+            hashes = c.execute(f"SELECT blob_hash FROM documents WHERE id IN ({placeholders})", ids_to_delete).fetchall()
+            c.execute(f"DELETE FROM documents WHERE id IN ({placeholders})", ids_to_delete)
+            _release_blobs(c, [h for (h,) in hashes if h])
         return True
     except Exception as e:
         print(f"Delete Error: {e}")
         return False
 
+# --- BLOB STORE ---
+# Uploaded files live in their own table, keyed by SHA-256 of the content.
+# documents.blob_hash points to them; identical re-uploads share one row
+# and ref_count says how many documents still use it.
+MIGRATION_BATCH_SIZE = 200
+BLOB_STORE_VERSION = 1 # PRAGMA user_version once file_blob has been migrated
+
+_migration_lock = threading.Lock()
+_blobs_migrated = False # Per process: init_db() runs on every Streamlit rerun
+
+def _create_blob_store(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS blobs
+                 (hash TEXT PRIMARY KEY,
+                  data BLOB,
+                  size INTEGER,
+                  ref_count INTEGER NOT NULL DEFAULT 0,
+                  created_at TIMESTAMP)''')
+
+def _put_blob(c, data):
+    """Stores data once (or adds a reference to the existing copy). Returns its hash."""
+    if data is None:
+        return None
+    blob_hash = hashlib.sha256(data).hexdigest()
+    c.execute('''INSERT INTO blobs (hash, data, size, ref_count, created_at) VALUES (?, ?, ?, 1, ?)
+                 ON CONFLICT(hash) DO UPDATE SET ref_count = ref_count + 1''',
+              (blob_hash, data, len(data), datetime.datetime.now()))
+    return blob_hash
+
+def _release_blobs(c, blob_hashes):
+    """Drops one reference per hash (repeats count twice); deletes blobs nobody uses any more."""
+    c.executemany("UPDATE blobs SET ref_count = ref_count - 1 WHERE hash = ?", [(h,) for h in blob_hashes])
+    c.execute("DELETE FROM blobs WHERE ref_count <= 0")
+
+def _migrate_file_blobs():
+    """
+    Old databases stored the file bytes in documents.file_blob.
+    1. Moves every file_blob into the blob store (small batches, so writers are never locked out for long).
+    2. Empties file_blob, so the documents table shrinks back to metadata only.
+    3. Records completion in PRAGMA user_version, so later calls skip the scan.
+    (The blob_hash column itself is added by _add_missing_columns.)
+    Runs once per process; each batch holds the write lock from its SELECT on,
+    so concurrent callers (threads or processes) never move the same row twice.
+    """
+    global _blobs_migrated
+    with _migration_lock:
+        if _blobs_migrated:
+            return
+
+        conn = get_connection()
+        if conn.execute("PRAGMA user_version").fetchone()[0] < BLOB_STORE_VERSION:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(documents)")]
+            moved = 0
+            while "file_blob" in columns:
+                with transaction() as c:
+                    rows = c.execute("SELECT id, file_blob FROM documents WHERE file_blob IS NOT NULL LIMIT ?",
+                                     (MIGRATION_BATCH_SIZE,)).fetchall()
+                    for doc_id, data in rows:
+                        c.execute("UPDATE documents SET blob_hash = ?, file_blob = NULL WHERE id = ?",
+                                  (_put_blob(c, data), doc_id))
+                if not rows:
+                    break
+                moved += len(rows)
+            if moved:
+                print(f"🗄️ Moved {moved} uploaded files into the blob store")
+
+            with transaction() as c:
+                c.execute(f"PRAGMA user_version = {BLOB_STORE_VERSION}")
+
+        _blobs_migrated = True
+
+def file_sha256(path):
+    """Content hash of a file on disk (same hash as the blob store), read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def store_blob(data):
+    """Adds one reference to data in the blob store (e.g. for a queued job). Returns its hash."""
+    with transaction() as c:
+        return _put_blob(c, data)
+
+def get_blob(blob_hash):
+    row = get_connection().execute("SELECT data FROM blobs WHERE hash = ?", (blob_hash,)).fetchone()
+    return row[0] if row else None
+
+def release_blob(blob_hash):
+    """Drops the reference taken by store_blob."""
+    with transaction() as c:
+        _release_blobs(c, [blob_hash])
+
+def get_archived_hashes(blob_hashes):
+    """Which of these content hashes already belong to an archived document."""
+    blob_hashes = list(blob_hashes)
+    found = set()
+    conn = get_connection()
+    for start in range(0, len(blob_hashes), 500):
+        chunk = blob_hashes[start:start + 500]
+        rows = conn.execute(f"SELECT DISTINCT blob_hash FROM documents WHERE blob_hash IN ({','.join(['?']*len(chunk))})", chunk)
+        found.update(row[0] for row in rows)
+    return found
+
+def get_document_file(doc_id):
+    """Returns (filename, file_type, bytes) of an archived upload, or None."""
+    return get_connection().execute('''SELECT d.filename, d.file_type, b.data FROM documents d
+                                       LEFT JOIN blobs b ON b.hash = d.blob_hash WHERE d.id = ?''', (doc_id,)).fetchone()
+
+# --- FULL-TEXT SEARCH (FTS5) ---
+# documents_fts indexes filename, extracted_text and summary without storing
+# a second copy of them (external content = documents). Triggers keep it in
+# sync. Rows that existed before the index was created are added by a
+# background backfill, a few hundred rows per transaction.
+FTS_BACKFILL_BATCH_SIZE = 500
+FTS_ENABLED = True
+
+# A row is in the index unless it is still waiting for the backfill
+_FTS_INDEXED = "(SELECT {id} > upto OR {id} <= done FROM fts_backfill)"
+
+_search_index_ready = False # Per process: init_db() runs on every Streamlit rerun
+_backfill_lock = threading.Lock()
+_backfill_thread = None
+
+def _create_search_index():
+    """
+    Creates the FTS table, the backfill bookmark and the triggers in ONE
+    transaction (BEGIN IMMEDIATE), so no other session can see half of them.
+    """
+    global FTS_ENABLED, _search_index_ready
+    if _search_index_ready:
+        return
+    try:
+        with transaction() as c:
+            c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5
+                         (filename, extracted_text, summary,
+                          content='documents', content_rowid='id', tokenize='unicode61 remove_diacritics 2')''')
+            c.execute("CREATE TABLE IF NOT EXISTS fts_backfill (upto INTEGER, done INTEGER)")
+            if c.execute("SELECT 1 FROM fts_backfill").fetchone() is None:
+                # Everything up to the current last id needs the backfill; newer rows come from the triggers.
+                # (Also repairs databases where an older version created the table but died before this row.)
+                c.execute("INSERT INTO fts_backfill SELECT COALESCE(MAX(id), 0), 0 FROM documents")
+
+            old_indexed = _FTS_INDEXED.format(id="old.id")
+            c.execute('''CREATE TRIGGER IF NOT EXISTS documents_fts_insert AFTER INSERT ON documents BEGIN
+                           INSERT INTO documents_fts(rowid, filename, extracted_text, summary)
+                           VALUES (new.id, new.filename, new.extracted_text, new.summary);
+                         END''')
+            c.execute(f'''CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents
+                          WHEN {old_indexed} BEGIN
+                            INSERT INTO documents_fts(documents_fts, rowid, filename, extracted_text, summary)
+                            VALUES ('delete', old.id, old.filename, old.extracted_text, old.summary);
+                          END''')
+            c.execute(f'''CREATE TRIGGER IF NOT EXISTS documents_fts_update AFTER UPDATE OF filename, extracted_text, summary ON documents
+                          WHEN {old_indexed} BEGIN
+                            INSERT INTO documents_fts(documents_fts, rowid, filename, extracted_text, summary)
+                            VALUES ('delete', old.id, old.filename, old.extracted_text, old.summary);
+                            INSERT INTO documents_fts(rowid, filename, extracted_text, summary)
+                            VALUES (new.id, new.filename, new.extracted_text, new.summary);
+                          END''')
+        _search_index_ready = True
+    except sqlite3.OperationalError as e:
+        # Some SQLite builds ship without FTS5
+        FTS_ENABLED = False
+        print(f"⚠️ Full-text search disabled: {e}")
+
+def backfill_search_index(batch_size=FTS_BACKFILL_BATCH_SIZE, max_batches=None):
+    """
+    Indexes pre-existing documents, one short transaction per batch, so writers
+    only ever wait for one batch. Returns how many documents are still pending.
+    """
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction() as c:
+            row = c.execute("SELECT upto, done FROM fts_backfill").fetchone()
+            if row is None:
+                return 0
+            upto, done = row
+            ids = [row[0] for row in c.execute("SELECT id FROM documents WHERE id > ? AND id <= ? ORDER BY id LIMIT ?",
+                                               (done, upto, batch_size))]
+            if not ids:
+                c.execute("UPDATE fts_backfill SET done = upto")
+                return 0
+            c.execute('''INSERT INTO documents_fts(rowid, filename, extracted_text, summary)
+                         SELECT id, filename, extracted_text, summary FROM documents WHERE id >= ? AND id <= ?''',
+                      (ids[0], ids[-1]))
+            c.execute("UPDATE fts_backfill SET done = ?", (ids[-1],))
+        batches += 1
+    with transaction() as c:
+        return c.execute('''SELECT COUNT(*) FROM documents, fts_backfill
+                            WHERE documents.id > done AND documents.id <= upto''').fetchone()[0]
+
+def start_search_backfill():
+    """
+    Runs the backfill in a daemon thread if anything is pending (returns at once).
+    At most one backfill thread per process; batches are safe across processes.
+    """
+    global _backfill_thread
+    if not FTS_ENABLED:
+        return
+
+    def _run():
+        try:
+            backfill_search_index()
+            print("✅ Search index backfill finished")
+        except Exception as e:
+            print(f"❌ Search index backfill failed: {e}")
+        finally:
+            close_connection()
+
+    with _backfill_lock:
+        if _backfill_thread is not None and _backfill_thread.is_alive():
+            return
+        row = get_connection().execute("SELECT upto, done FROM fts_backfill").fetchone()
+        if row is None or row[1] >= row[0]:
+            return
+        _backfill_thread = threading.Thread(target=_run, name="fts-backfill", daemon=True)
+        _backfill_thread.start()
+
+def _fts_query(text):
+    """User text -> safe FTS5 query: every word must appear, the last one as a prefix."""
+    terms = ['"' + term.replace('"', '""') + '"' for term in text.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+SEARCH_COLUMNS = ["id", "upload_date", "filename", "category", "confidence", "snippet", "rank"]
+
+def search_documents(query, limit=20, filters=None):
+    """
+    Full-text search over filename, extracted text and summary.
+    Ranked by BM25 (summary and filename matches weigh more than body text),
+    with a highlighted snippet per hit. filters: same keys as get_history_page.
+    Returns a DataFrame (best match first).
+    """
+    match = _fts_query(query or "")
+    if not FTS_ENABLED or not match:
+        return pd.DataFrame(columns=SEARCH_COLUMNS)
+
+    clauses, params = _history_filters(filters)
+    where = "".join(f" AND {clause}" for clause in clauses)
+    rows = get_connection().execute(
+        f'''SELECT d.id, d.upload_date, d.filename, d.category, d.confidence,
+                  snippet(documents_fts, -1, '**', '**', ' … ', 16),
+                  bm25(documents_fts, 2.0, 1.0, 3.0) AS rank
+           FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid
+           WHERE documents_fts MATCH ?{where}
+           ORDER BY rank LIMIT ?''', [match] + params + [limit]).fetchall()
+    return pd.DataFrame(rows, columns=SEARCH_COLUMNS)
+
+# --- SUMMARY CACHE ---
+_summary_cache_ready = False
+
+def _create_summary_cache(c):
+    global _summary_cache_ready
+    c.execute('''CREATE TABLE IF NOT EXISTS summary_cache
+                 (cache_key TEXT PRIMARY KEY,
+                  summary TEXT,
+                  size INTEGER,
+                  created_at TIMESTAMP,
+                  last_used TIMESTAMP)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_summary_cache_last_used ON summary_cache(last_used)")
+    if not c.execute("SELECT name FROM sqlite_master WHERE name = 'summary_cache_stats'").fetchone():
+        # Running totals (one row), so the eviction check never scans the cache
+        c.execute("CREATE TABLE summary_cache_stats (entries INTEGER NOT NULL, bytes INTEGER NOT NULL)")
+        c.execute("INSERT INTO summary_cache_stats SELECT COUNT(*), COALESCE(SUM(size), 0) FROM summary_cache")
+        c.execute('''CREATE TRIGGER summary_cache_ai AFTER INSERT ON summary_cache BEGIN
+                       UPDATE summary_cache_stats SET entries = entries + 1, bytes = bytes + IFNULL(new.size, 0);
+                     END''')
+        c.execute('''CREATE TRIGGER summary_cache_ad AFTER DELETE ON summary_cache BEGIN
+                       UPDATE summary_cache_stats SET entries = entries - 1, bytes = bytes - IFNULL(old.size, 0);
+                     END''')
+        c.execute('''CREATE TRIGGER summary_cache_au AFTER UPDATE OF size ON summary_cache BEGIN
+                       UPDATE summary_cache_stats SET bytes = bytes - IFNULL(old.size, 0) + IFNULL(new.size, 0);
+                     END''')
+    _summary_cache_ready = True
+
+def _ensure_summary_cache():
+    # Batch scripts may never call init_db(), so create the table on first use
+    if not _summary_cache_ready:
+        with transaction() as c:
+            _create_summary_cache(c)
+
+def get_cached_summary(cache_key):
+    """Returns the cached summary for cache_key (and marks it as recently used), or None."""
+    try:
+        _ensure_summary_cache()
+        # Plain read (autocommit): a lookup never waits for the write lock
+        row = get_connection().execute("SELECT summary FROM summary_cache WHERE cache_key = ?", (cache_key,)).fetchone()
+        if row is None:
+            return None
+        # Only a hit writes: bump last_used for the LRU eviction
+        with transaction() as c:
+            c.execute("UPDATE summary_cache SET last_used = ? WHERE cache_key = ?", (datetime.datetime.now(), cache_key))
+        return row[0]
+    except Exception as e:
+        # The cache is an optimisation: never fail the summary because of it
+        print(f"Summary cache read error: {e}")
+        return None
+
+def put_cached_summary(cache_key, summary):
+    """Stores a summary, then evicts least-recently-used entries if over the count/size limits."""
+    try:
+        _ensure_summary_cache()
+        with transaction() as c:
+            now = datetime.datetime.now()
+            # Upsert, not INSERT OR REPLACE: REPLACE's implicit delete would skip the stats trigger
+            c.execute('''INSERT INTO summary_cache (cache_key, summary, size, created_at, last_used)
+                         VALUES (?, ?, ?, ?, ?)
+                         ON CONFLICT(cache_key) DO UPDATE SET
+                           summary = excluded.summary, size = excluded.size, last_used = excluded.last_used''',
+                      (cache_key, summary, len(summary.encode("utf-8")), now, now))
+
+            # Evict oldest entries until both limits hold again
+            max_bytes = SUMMARY_CACHE_MAX_MB * 1024 * 1024
+            while True:
+                count, total = c.execute("SELECT entries, bytes FROM summary_cache_stats").fetchone()
+                if count <= SUMMARY_CACHE_MAX_ENTRIES and total <= max_bytes:
+                    break
+                excess = max(count - SUMMARY_CACHE_MAX_ENTRIES, 100)
+                c.execute('''DELETE FROM summary_cache WHERE cache_key IN
+                             (SELECT cache_key FROM summary_cache ORDER BY last_used ASC LIMIT ?)''', (excess,))
+    except Exception as e:
+        print(f"Summary cache write error: {e}")
+
 # --- TEXT METRIC FUNCTIONS (Restored) ---
 def calculate_text_metrics(text):
     if not text: return None